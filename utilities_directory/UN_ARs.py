@@ -1,986 +1,46 @@
 # %%
 import pandas as pd
 import numpy as np
+import functools
 import io
 import itertools
+import json
 import math
 import os
-import seaborn as sns
+import re
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from .extractor_ARs import cache_is_fresh, store_signature
+    from .region_definitions import read_region_definitions, region_definition
+except ImportError:
+    from extractor_ARs import cache_is_fresh, store_signature
+    from region_definitions import read_region_definitions, region_definition
 np.seterr(invalid="ignore")
 
 # %%
 def createIPCC1R():
     """Returns a dictionary having 
     keys as IPCC 1 region and values using WORLD as a reference"""
-    IPCCreg = ["WORLD"
-                ]
-    UNreg = [["WORLD"]]
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC1R")
 
 
 def createIPCC5R():
     """Returns a dictionary having 
     keys as IPCC 5 regions and values as UN country names"""
-
-    IPCCreg = ["WORLD", "R5ASIA","R5LAM", "R5MAF", 
-                "R5OECD90+EU", "R5REF",
-                ]
-    UNreg   = [
-                [
-                "Burundi",
-                "Comoros",
-                "Djibouti",
-                "Eritrea",
-                "Ethiopia",
-                "Kenya",
-                "Madagascar",
-                "Malawi",
-                "Mauritius",
-                "Mayotte",
-                "Mozambique",
-                "Réunion",
-                "Rwanda",
-                "Seychelles",
-                "Somalia",
-                "South Sudan",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Zambia",
-                "Zimbabwe",
-                "Angola",
-                "Cameroon",
-                "Central African Republic",
-                "Chad",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Equatorial Guinea",
-                "Gabon",
-                "Sao Tome and Principe",
-                "Algeria",
-                "Egypt",
-                "Libya",
-                "Morocco",
-                "Sudan",
-                "Tunisia",
-                "Western Sahara",
-                "Botswana",
-                "Eswatini",
-                "Swaziland", 
-                "Lesotho",
-                "Namibia",
-                "South Africa",
-                "Benin",
-                "Burkina Faso",
-                "Cabo Verde",
-                "Côte d'Ivoire",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Liberia",
-                "Mali",
-                "Mauritania",
-                "Niger",
-                "Nigeria",
-                "Saint Helena",
-                "Senegal",
-                "Sierra Leone",
-                "Togo",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Tajikistan",
-                "Turkmenistan",
-                "Uzbekistan",
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "China, Taiwan Province of China",
-                "Dem. People's Republic of Korea",
-                "Japan",
-                "Mongolia",
-                "Republic of Korea",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "India",
-                "Iran (Islamic Republic of)",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                "Brunei Darussalam",
-                "Cambodia",
-                "Indonesia",
-                "Lao People's Democratic Republic",
-                "Malaysia",
-                "Myanmar",
-                "Philippines",
-                "Singapore",
-                "Thailand",
-                "Timor-Leste",
-                "Viet Nam",
-                "Armenia",
-                "Azerbaijan",
-                "Bahrain",
-                "Cyprus",
-                "Georgia",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "State of Palestine",
-                "Syrian Arab Republic",
-                "Türkiye",
-                "United Arab Emirates",
-                "Yemen",
-                "Belarus",
-                "Bulgaria",
-                "Czechia",
-                "Czech Republic", 
-                "Hungary",
-                "Poland",
-                "Republic of Moldova",
-                "Romania",
-                "Russian Federation",
-                "Slovakia",
-                "Ukraine",
-                "Denmark",
-                "Estonia",
-                "Faroe Islands",
-                "Finland",
-                "Guernsey",
-                "Iceland",
-                "Ireland",
-                "Isle of Man",
-                "Jersey",
-                "Latvia",
-                "Lithuania",
-                "Norway",
-                "Sweden",
-                "United Kingdom",
-                "Albania",
-                "Andorra",
-                "Bosnia and Herzegovina",
-                "Croatia",
-                "Gibraltar",
-                "Greece",
-                "Holy See",
-                "Italy",
-                "Kosovo (under UNSC res. 1244)",
-                "Malta",
-                "Montenegro",
-                "North Macedonia",
-                "Portugal",
-                "San Marino",
-                "Serbia",
-                "Slovenia",
-                "Spain",
-                "Austria",
-                "Belgium",
-                "France",
-                "Germany",
-                "Liechtenstein",
-                "Luxembourg",
-                "Monaco",
-                "Netherlands",
-                "Switzerland",
-                "Anguilla",
-                "Antigua and Barbuda",
-                "Aruba",
-                "Bahamas",
-                "Barbados",
-                "Bonaire, Sint Eustatius and Saba",
-                "British Virgin Islands",
-                "Cayman Islands",
-                "Cuba",
-                "Curaçao",
-                "Dominica",
-                "Dominican Republic",
-                "Grenada",
-                "Guadeloupe",
-                "Haiti",
-                "Jamaica",
-                "Martinique",
-                "Montserrat",
-                "Puerto Rico",
-                "Saint Barthélemy",
-                "Saint Kitts and Nevis",
-                "Saint Lucia",
-                "Saint Martin (French part)",
-                "Saint Vincent and the Grenadines",
-                "Sint Maarten (Dutch part)",
-                "Trinidad and Tobago",
-                "Turks and Caicos Islands",
-                "United States Virgin Islands",
-                "Belize",
-                "Costa Rica",
-                "El Salvador",
-                "Guatemala",
-                "Honduras",
-                "Mexico",
-                "Nicaragua",
-                "Panama",
-                "Argentina",
-                "Bolivia (Plurinational State of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Ecuador",
-                "Falkland Islands (Malvinas)",
-                "French Guiana",
-                "Guyana",
-                "Paraguay",
-                "Peru",
-                "Suriname",
-                "Uruguay",
-                "Venezuela (Bolivarian Republic of)",
-                "Bermuda",
-                "Canada",
-                "Greenland",
-                "Saint Pierre and Miquelon",
-                "United States of America",
-                "Australia",
-                "New Zealand",
-                "Fiji",
-                "New Caledonia",
-                "Papua New Guinea",
-                "Solomon Islands",
-                "Vanuatu",
-                "Guam",
-                "Kiribati",
-                "Marshall Islands",
-                "Micronesia (Fed. States of)",
-                "Nauru",
-                "Northern Mariana Islands",
-                "Palau",
-                "American Samoa",
-                "Cook Islands",
-                "French Polynesia",
-                "Niue",
-                "Samoa",
-                "Tokelau",
-                "Tonga",
-                "Tuvalu",
-                "Wallis and Futuna Islands",
-                "Turkey",
-                "Other non-specified areas",
-                "Channel Islands",
-                "Faeroe Islands",
-                "TFYR Macedonia",
-                "Caribbean Netherlands", 
-                "Netherlands Antilles",
-                ],
-                [
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "Mongolia",
-                "China, Taiwan Province of China",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "India",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                "Brunei Darussalam",
-                "Cambodia",
-                "Dem. People's Republic of Korea",
-                "Timor-Leste",
-                "Indonesia",
-                "Lao People's Democratic Republic",
-                "Malaysia",
-                "Myanmar",
-                "Papua New Guinea",
-                "Philippines",
-                "Republic of Korea",
-                "Singapore",
-                "Thailand",
-                "Viet Nam",
-                ],
-                [
-                "Argentina",
-                "Bahamas",
-                "Barbados",
-                "Belize",
-                "Venezuela (Bolivarian Republic of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Costa Rica",
-                "Cuba",
-                "Dominican Republic",
-                "Ecuador",
-                "El Salvador",
-                "Guadeloupe",
-                "Guatemala",
-                "Guyana",
-                "Haiti",
-                "Honduras",
-                "Jamaica",
-                "Martinique",
-                "Mexico",
-                "Aruba",
-                "Bonaire, Sint Eustatius and Saba",
-                "Curaçao",
-                "Caribbean Netherlands",
-                "Nicaragua",
-                "Panama",
-                "Paraguay",
-                "Peru",
-                "Puerto Rico",
-                "Suriname",
-                "Trinidad and Tobago",
-                "Uruguay",
-                "Venezuela (Bolivarian Republic of)",
-                "Saint Vincent and the Grenadines",
-                "United States Virgin Islands",
-                "French Guiana",
-                "Saint Lucia",
-                "Turks and Caicos Islands",
-                "Grenada",
-                "Bolivia (Plurinational State of)",
-                "Sao Tome and Principe",
-                ],
-                [
-                "Bahrain",
-                "Iran (Islamic Republic of)",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "Syrian Arab Republic",
-                "United Arab Emirates",
-                "Yemen",
-                "Algeria",
-                "Angola",
-                "Benin",
-                "Botswana",
-                "Burkina Faso",
-                "Burundi",
-                "Côte d'Ivoire",
-                "Cameroon",
-                "Cabo Verde",
-                "Central African Republic",
-                "Chad",
-                "Comoros",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Djibouti",
-                "Egypt",
-                "Equatorial Guinea",
-                "Eritrea",
-                "Ethiopia",
-                "Gabon",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Kenya",
-                "Lesotho",
-                "Liberia",
-                "Libya",
-                "Madagascar",
-                "Malawi",
-                "Mali",
-                "Mauritania",
-                "Mauritius",
-                "Morocco",
-                "Mozambique",
-                "Namibia",
-                "Niger",
-                "Nigeria",
-                "Réunion",
-                "Rwanda",
-                "Senegal",
-                "Sierra Leone",
-                "Somalia",
-                "South Africa",
-                "Sudan",
-                "Swaziland",
-                "Togo",
-                "Tunisia",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Western Sahara",
-                "Zambia",
-                "Zimbabwe",
-                "Mayotte",
-                "Eswatini",
-                "State of Palestine",
-                ],
-                [
-                "Albania",
-                "Austria",
-                "Belgium",
-                "Bosnia and Herzegovina",
-                "Bulgaria",
-                "Croatia",
-                "Cyprus",
-                "Czechia",
-                "Czech Republic",
-                "Denmark",
-                "Estonia",
-                "Finland",
-                "France",
-                "Germany",
-                "Greece",
-                "Hungary",
-                "Iceland",
-                "Ireland",
-                "Italy",
-                "Latvia",
-                "Lithuania",
-                "Luxembourg",
-                "North Macedonia",
-                "TFYR Macedonia",
-                "Malta",
-                "Montenegro",
-                "Netherlands",
-                "Norway",
-                "Poland",
-                "Portugal",
-                "Spain",
-                "Sweden",
-                "Switzerland",
-                "Turkey",
-                "United Kingdom",
-                "Canada",
-                "United States of America",
-                "Australia",
-                "Fiji",
-                "French Polynesia",
-                "Guam",
-                "Japan",
-                "New Caledonia",
-                "New Zealand",
-                "Romania",
-                "Samoa",
-                "Serbia",
-                "Slovakia",
-                "Slovenia",
-                "Solomon Islands",
-                "Vanuatu",
-                "Tonga",
-                "Micronesia (Fed. States of)",
-                ],
-                [
-                "Armenia",
-                "Azerbaijan",
-                "Belarus",
-                "Georgia",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Republic of Moldova",
-                "Russian Federation",
-                "Tajikistan",
-                "Turkmenistan",
-                "Ukraine",
-                "Uzbekistan",
-                ],
-                ]
-    
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC5R")
 
 def createIPCC6R():
     """Returns a dictionary having 
     keys as IPCC 5 regions and values as UN country names"""
-
-    IPCCreg = ["WORLD", "R6ASIA","R6LAM", "R6MIDDLE_EAST", "R6AFRICA", 
-                "R6OECD90+EU", "R6REF",
-                ]
-    UNreg   = [
-                [
-                "Burundi",
-                "Comoros",
-                "Djibouti",
-                "Eritrea",
-                "Ethiopia",
-                "Kenya",
-                "Madagascar",
-                "Malawi",
-                "Mauritius",
-                "Mayotte",
-                "Mozambique",
-                "Réunion",
-                "Rwanda",
-                "Seychelles",
-                "Somalia",
-                "South Sudan",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Zambia",
-                "Zimbabwe",
-                "Angola",
-                "Cameroon",
-                "Central African Republic",
-                "Chad",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Equatorial Guinea",
-                "Gabon",
-                "Sao Tome and Principe",
-                "Algeria",
-                "Egypt",
-                "Libya",
-                "Morocco",
-                "Sudan",
-                "Tunisia",
-                "Western Sahara",
-                "Botswana",
-                "Eswatini",
-                "Swaziland", 
-                "Lesotho",
-                "Namibia",
-                "South Africa",
-                "Benin",
-                "Burkina Faso",
-                "Cabo Verde",
-                "Côte d'Ivoire",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Liberia",
-                "Mali",
-                "Mauritania",
-                "Niger",
-                "Nigeria",
-                "Saint Helena",
-                "Senegal",
-                "Sierra Leone",
-                "Togo",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Tajikistan",
-                "Turkmenistan",
-                "Uzbekistan",
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "China, Taiwan Province of China",
-                "Dem. People's Republic of Korea",
-                "Japan",
-                "Mongolia",
-                "Republic of Korea",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "India",
-                "Iran (Islamic Republic of)",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                "Brunei Darussalam",
-                "Cambodia",
-                "Indonesia",
-                "Lao People's Democratic Republic",
-                "Malaysia",
-                "Myanmar",
-                "Philippines",
-                "Singapore",
-                "Thailand",
-                "Timor-Leste",
-                "Viet Nam",
-                "Armenia",
-                "Azerbaijan",
-                "Bahrain",
-                "Cyprus",
-                "Georgia",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "State of Palestine",
-                "Syrian Arab Republic",
-                "Türkiye",
-                "United Arab Emirates",
-                "Yemen",
-                "Belarus",
-                "Bulgaria",
-                "Czechia",
-                "Czech Republic", 
-                "Hungary",
-                "Poland",
-                "Republic of Moldova",
-                "Romania",
-                "Russian Federation",
-                "Slovakia",
-                "Ukraine",
-                "Denmark",
-                "Estonia",
-                "Faroe Islands",
-                "Finland",
-                "Guernsey",
-                "Iceland",
-                "Ireland",
-                "Isle of Man",
-                "Jersey",
-                "Latvia",
-                "Lithuania",
-                "Norway",
-                "Sweden",
-                "United Kingdom",
-                "Albania",
-                "Andorra",
-                "Bosnia and Herzegovina",
-                "Croatia",
-                "Gibraltar",
-                "Greece",
-                "Holy See",
-                "Italy",
-                "Kosovo (under UNSC res. 1244)",
-                "Malta",
-                "Montenegro",
-                "North Macedonia",
-                "Portugal",
-                "San Marino",
-                "Serbia",
-                "Slovenia",
-                "Spain",
-                "Austria",
-                "Belgium",
-                "France",
-                "Germany",
-                "Liechtenstein",
-                "Luxembourg",
-                "Monaco",
-                "Netherlands",
-                "Switzerland",
-                "Anguilla",
-                "Antigua and Barbuda",
-                "Aruba",
-                "Bahamas",
-                "Barbados",
-                "Bonaire, Sint Eustatius and Saba",
-                "British Virgin Islands",
-                "Cayman Islands",
-                "Cuba",
-                "Curaçao",
-                "Dominica",
-                "Dominican Republic",
-                "Grenada",
-                "Guadeloupe",
-                "Haiti",
-                "Jamaica",
-                "Martinique",
-                "Montserrat",
-                "Puerto Rico",
-                "Saint Barthélemy",
-                "Saint Kitts and Nevis",
-                "Saint Lucia",
-                "Saint Martin (French part)",
-                "Saint Vincent and the Grenadines",
-                "Sint Maarten (Dutch part)",
-                "Trinidad and Tobago",
-                "Turks and Caicos Islands",
-                "United States Virgin Islands",
-                "Belize",
-                "Costa Rica",
-                "El Salvador",
-                "Guatemala",
-                "Honduras",
-                "Mexico",
-                "Nicaragua",
-                "Panama",
-                "Argentina",
-                "Bolivia (Plurinational State of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Ecuador",
-                "Falkland Islands (Malvinas)",
-                "French Guiana",
-                "Guyana",
-                "Paraguay",
-                "Peru",
-                "Suriname",
-                "Uruguay",
-                "Venezuela (Bolivarian Republic of)",
-                "Bermuda",
-                "Canada",
-                "Greenland",
-                "Saint Pierre and Miquelon",
-                "United States of America",
-                "Australia",
-                "New Zealand",
-                "Fiji",
-                "New Caledonia",
-                "Papua New Guinea",
-                "Solomon Islands",
-                "Vanuatu",
-                "Guam",
-                "Kiribati",
-                "Marshall Islands",
-                "Micronesia (Fed. States of)",
-                "Nauru",
-                "Northern Mariana Islands",
-                "Palau",
-                "American Samoa",
-                "Cook Islands",
-                "French Polynesia",
-                "Niue",
-                "Samoa",
-                "Tokelau",
-                "Tonga",
-                "Tuvalu",
-                "Wallis and Futuna Islands",
-                "Turkey",
-                "Other non-specified areas",
-                "Channel Islands",
-                "Faeroe Islands",
-                "TFYR Macedonia",
-                "Caribbean Netherlands", "Netherlands Antilles",
-                ],
-                [
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "Mongolia",
-                "China, Taiwan Province of China",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "India",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                "Brunei Darussalam",
-                "Cambodia",
-                "Dem. People's Republic of Korea",
-                "Timor-Leste",
-                "Indonesia",
-                "Lao People's Democratic Republic",
-                "Malaysia",
-                "Myanmar",
-                "Papua New Guinea",
-                "Philippines",
-                "Republic of Korea",
-                "Singapore",
-                "Thailand",
-                "Viet Nam",
-                ],
-                [
-                "Argentina",
-                "Bahamas",
-                "Barbados",
-                "Belize",
-                "Venezuela (Bolivarian Republic of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Costa Rica",
-                "Cuba",
-                "Dominican Republic",
-                "Ecuador",
-                "El Salvador",
-                "Guadeloupe",
-                "Guatemala",
-                "Guyana",
-                "Haiti",
-                "Honduras",
-                "Jamaica",
-                "Martinique",
-                "Mexico",
-                "Aruba",
-                "Bonaire, Sint Eustatius and Saba",
-                "Curaçao",
-                "Caribbean Netherlands",
-                "Nicaragua",
-                "Panama",
-                "Paraguay",
-                "Peru",
-                "Puerto Rico",
-                "Suriname",
-                "Trinidad and Tobago",
-                "Uruguay",
-                "Venezuela (Bolivarian Republic of)",
-                "Saint Vincent and the Grenadines",
-                "United States Virgin Islands",
-                "French Guiana",
-                "Saint Lucia",
-                "Turks and Caicos Islands",
-                "Grenada",
-                "Bolivia (Plurinational State of)",
-                "Sao Tome and Principe",
-                ],
-                [
-                "Bahrain",
-                "Iran (Islamic Republic of)",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "Syrian Arab Republic",
-                "United Arab Emirates",
-                "Yemen",
-                ],
-                [
-                "Algeria",
-                "Angola",
-                "Benin",
-                "Botswana",
-                "Burkina Faso",
-                "Burundi",
-                "Côte d'Ivoire",
-                "Cameroon",
-                "Cabo Verde",
-                "Central African Republic",
-                "Chad",
-                "Comoros",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Djibouti",
-                "Egypt",
-                "Equatorial Guinea",
-                "Eritrea",
-                "Ethiopia",
-                "Gabon",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Kenya",
-                "Lesotho",
-                "Liberia",
-                "Libya",
-                "Madagascar",
-                "Malawi",
-                "Mali",
-                "Mauritania",
-                "Mauritius",
-                "Morocco",
-                "Mozambique",
-                "Namibia",
-                "Niger",
-                "Nigeria",
-                "Réunion",
-                "Rwanda",
-                "Senegal",
-                "Sierra Leone",
-                "Somalia",
-                "South Africa",
-                "Sudan",
-                "Swaziland",
-                "Togo",
-                "Tunisia",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Western Sahara",
-                "Zambia",
-                "Zimbabwe",
-                "Mayotte",
-                "Eswatini",
-                "State of Palestine",
-                ],
-                [
-                "Albania",
-                "Austria",
-                "Belgium",
-                "Bosnia and Herzegovina",
-                "Bulgaria",
-                "Croatia",
-                "Cyprus",
-                "Czech Republic",
-                'Czechia',
-                "Denmark",
-                "Estonia",
-                "Finland",
-                "France",
-                "Germany",
-                "Greece",
-                "Hungary",
-                "Iceland",
-                "Ireland",
-                "Italy",
-                "Latvia",
-                "Lithuania",
-                "Luxembourg",
-                "North Macedonia",
-                "TFYR Macedonia",
-                "Malta",
-                "Montenegro",
-                "Netherlands",
-                "Norway",
-                "Poland",
-                "Portugal",
-                "Spain",
-                "Sweden",
-                "Switzerland",
-                "Turkey",
-                "United Kingdom",
-                "Canada",
-                "United States of America",
-                "Australia",
-                "Fiji",
-                "French Polynesia",
-                "Guam",
-                "Japan",
-                "New Caledonia",
-                "New Zealand",
-                "Romania",
-                "Samoa",
-                "Serbia",
-                "Slovakia",
-                "Slovenia",
-                "Solomon Islands",
-                "Vanuatu",
-                "Tonga",
-                "Micronesia (Fed. States of)",
-                ],
-                [
-                "Armenia",
-                "Azerbaijan",
-                "Belarus",
-                "Georgia",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Republic of Moldova",
-                "Russian Federation",
-                "Tajikistan",
-                "Turkmenistan",
-                "Ukraine",
-                "Uzbekistan",
-                ],
-                ]
-    
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC6R")
 
 def createIPCC5Rproj():
     """Returns a dictionary having 
     keys as IPCC 5 regions and values as UN country regions
     This function uses proxies to represent the IPCC regions
     to be used in the projections as there is not perfect match"""
-
-    IPCCreg = ["WORLD", "R5MAF", "R5LAM", "R5ASIA", "R5OECD90+EU", "R5REF" ] 
-    UNreg =[
-        ["WORLD"], 
-        ["AFRICA"], 
-        ["LATIN AMERICA AND THE CARIBBEAN"], 
-        ["ASIA"], 
-        ["More developed regions"], 
-        ["Russian Federation"]]
-    
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC5Rproj")
 
 
 def createIPCC6Rproj():
@@ -988,529 +48,270 @@ def createIPCC6Rproj():
     keys as IPCC 6 regions and values as UN country regions
     This function uses proxies to represent the IPCC regions
     to be used in the projections as there is not perfect match"""
-
-    IPCCreg = ["WORLD", "R6AFRICA", "R6LAM", "R6ASIA", "R6MIDDLE_EAST", "R6OECD90+EU", "R6REF" ] 
-    UNreg =[
-        ["WORLD"], 
-        ["AFRICA"], 
-        ["LATIN AMERICA AND THE CARIBBEAN"], 
-        ["ASIA"], 
-        ["Western Asia"],
-        ["More developed regions"], 
-        ["Russian Federation"]]
-    
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC6Rproj")
 
 def createIPCC10Rproj():
     """Returns a dictionary having 
     keys as IPCC 10 regions and values as UN country regions
     This function uses proxies to represent the IPCC regions
     to be used in the projections as there is not perfect match"""
-
-    IPCCreg = ["WORLD", 
-               "R10AFRICA",  	"R10CHINA+",	"R10EUROPE",	
-               "R10INDIA+",	    "R10LATIN_AM",	"R10MIDDLE_EAST",
-               "R10NORTH_AM",	"R10PAC_OECD",	"R10REF_ECON",	"R10REST_ASIA"
-                ]
-    UNreg =[
-        ["WORLD"], 
-        ["AFRICA"], 
-        ["China"],
-        ["EUROPE"],
-        ["Southern Asia"],
-        ["LATIN AMERICA AND THE CARIBBEAN"],  
-        ["Western Asia"],
-        ["NORTHERN AMERICA"], 
-        ["Japan", "OCEANIA"],
-        ["Russian Federation"],
-        ["South-Eastern Asia"]]
-    
-    return dict(zip(IPCCreg,UNreg))
+    return region_definition("IPCC10Rproj")
 
 def createIPCC10R():
     """Returns a dictionary having 
     keys as IPCC 10 regions and values as UN country names"""
+    return region_definition("IPCC10R")
+
+# %%
+def region_groupings():
+    """Returns a dictionary with the createIPCC*R-style dictionary of every grouping:
+    5R, 6R, 10R, their *proj variants, SIDs, LDCs and LLDCs"""
+    return {"5R": createIPCC5R(),
+            "6R": createIPCC6R(),
+            "10R": createIPCC10R(),
+            "5Rproj": createIPCC5Rproj(),
+            "6Rproj": createIPCC6Rproj(),
+            "10Rproj": createIPCC10Rproj(),
+            "SIDs": {"SIDs": region_definition("SIDs")},
+            "LDCs": {"LDCs": region_definition("LDCs")},
+            "LLDCs": {"LLDCs": region_definition("LLDCs")}}
+
+@functools.lru_cache(maxsize=None)
+def region_index():
+    """Compiles all the groupings of region_groupings into one index, built once per process
+    Returns
+        index: dataframe with one row per UN name and one integer column per grouping
+        with the code of its region (-1 if the name is not in the grouping).
+        WORLD is not a region of the index, and a name listed in two regions
+        of the same grouping keeps the first one
+        names: dictionary with the list of region names of each grouping,
+        code i of a grouping is names[grouping][i]
+    The returned objects are shared, do not modify them"""
+    groupings = region_groupings()
+    names = {}
+    codes = {}
+    for grouping, reg_dict in groupings.items():
+        names[grouping] = [reg for reg in reg_dict if reg != "WORLD"]
+        codes[grouping] = {}
+        for code, reg in enumerate(names[grouping]):
+            for name in reg_dict[reg]:
+                codes[grouping].setdefault(name, code)
+    index = pd.DataFrame(codes).fillna(-1).astype(np.int16)
+    index.index.name = "UNRegion"
+    return index, names
+
+def label_regions(frame: pd.DataFrame, column="UNRegion", groupings=None):
+    """Labels a UN dataframe with its region in every grouping using region_index
+    Receives
+        frame: dataframe with UN names in column
+        column: column with the UN names
+        groupings: list of groupings to label (e.g. ["5R", "SIDs"]), None for all
+    Returns a copy of frame with one column per grouping holding the region name,
+    missing where the UN name does not belong to the grouping"""
+    index, names = region_index()
+    if groupings is None:
+        groupings = list(names)
+    labelled = frame.copy()
+    for grouping in groupings:
+        codes = frame[column].map(index[grouping]).fillna(-1).astype(int).to_numpy()
+        # code -1 picks the None appended at the end of the names
+        labels = np.array(names[grouping] + [None], dtype=object)
+        labelled[grouping] = labels[codes]
+    return labelled
 
-    IPCCreg = ["WORLD", 
-               "R10AFRICA",  	"R10CHINA+",	"R10EUROPE",	
-               "R10INDIA+",	    "R10LATIN_AM",	"R10MIDDLE_EAST",
-               "R10NORTH_AM",	"R10PAC_OECD",	"R10REF_ECON",	"R10REST_ASIA"
-                ]
-    UNreg   = [
-                [
-                "Burundi",
-                "Comoros",
-                "Djibouti",
-                "Eritrea",
-                "Ethiopia",
-                "Kenya",
-                "Madagascar",
-                "Malawi",
-                "Mauritius",
-                "Mayotte",
-                "Mozambique",
-                "Réunion",
-                "Rwanda",
-                "Seychelles",
-                "Somalia",
-                "South Sudan",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Zambia",
-                "Zimbabwe",
-                "Angola",
-                "Cameroon",
-                "Central African Republic",
-                "Chad",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Equatorial Guinea",
-                "Gabon",
-                "Sao Tome and Principe",
-                "Algeria",
-                "Egypt",
-                "Libya",
-                "Morocco",
-                "Sudan",
-                "Tunisia",
-                "Western Sahara",
-                "Botswana",
-                "Eswatini",
-                "Swaziland", 
-                "Lesotho",
-                "Namibia",
-                "South Africa",
-                "Benin",
-                "Burkina Faso",
-                "Cabo Verde",
-                "Côte d'Ivoire",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Liberia",
-                "Mali",
-                "Mauritania",
-                "Niger",
-                "Nigeria",
-                "Saint Helena",
-                "Senegal",
-                "Sierra Leone",
-                "Togo",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Tajikistan",
-                "Turkmenistan",
-                "Uzbekistan",
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "China, Taiwan Province of China",
-                "Dem. People's Republic of Korea",
-                "Japan",
-                "Mongolia",
-                "Republic of Korea",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "India",
-                "Iran (Islamic Republic of)",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                "Brunei Darussalam",
-                "Cambodia",
-                "Indonesia",
-                "Lao People's Democratic Republic",
-                "Malaysia",
-                "Myanmar",
-                "Philippines",
-                "Singapore",
-                "Thailand",
-                "Timor-Leste",
-                "Viet Nam",
-                "Armenia",
-                "Azerbaijan",
-                "Bahrain",
-                "Cyprus",
-                "Georgia",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "State of Palestine",
-                "Syrian Arab Republic",
-                "Türkiye",
-                "United Arab Emirates",
-                "Yemen",
-                "Belarus",
-                "Bulgaria",
-                "Czechia",
-                "Czech Republic", 
-                "Hungary",
-                "Poland",
-                "Republic of Moldova",
-                "Romania",
-                "Russian Federation",
-                "Slovakia",
-                "Ukraine",
-                "Denmark",
-                "Estonia",
-                "Faroe Islands",
-                "Finland",
-                "Guernsey",
-                "Iceland",
-                "Ireland",
-                "Isle of Man",
-                "Jersey",
-                "Latvia",
-                "Lithuania",
-                "Norway",
-                "Sweden",
-                "United Kingdom",
-                "Albania",
-                "Andorra",
-                "Bosnia and Herzegovina",
-                "Croatia",
-                "Gibraltar",
-                "Greece",
-                "Holy See",
-                "Italy",
-                "Kosovo (under UNSC res. 1244)",
-                "Malta",
-                "Montenegro",
-                "North Macedonia",
-                "Portugal",
-                "San Marino",
-                "Serbia",
-                "Slovenia",
-                "Spain",
-                "Austria",
-                "Belgium",
-                "France",
-                "Germany",
-                "Liechtenstein",
-                "Luxembourg",
-                "Monaco",
-                "Netherlands",
-                "Switzerland",
-                "Anguilla",
-                "Antigua and Barbuda",
-                "Aruba",
-                "Bahamas",
-                "Barbados",
-                "Bonaire, Sint Eustatius and Saba",
-                "British Virgin Islands",
-                "Cayman Islands",
-                "Cuba",
-                "Curaçao",
-                "Dominica",
-                "Dominican Republic",
-                "Grenada",
-                "Guadeloupe",
-                "Haiti",
-                "Jamaica",
-                "Martinique",
-                "Montserrat",
-                "Puerto Rico",
-                "Saint Barthélemy",
-                "Saint Kitts and Nevis",
-                "Saint Lucia",
-                "Saint Martin (French part)",
-                "Saint Vincent and the Grenadines",
-                "Sint Maarten (Dutch part)",
-                "Trinidad and Tobago",
-                "Turks and Caicos Islands",
-                "United States Virgin Islands",
-                "Belize",
-                "Costa Rica",
-                "El Salvador",
-                "Guatemala",
-                "Honduras",
-                "Mexico",
-                "Nicaragua",
-                "Panama",
-                "Argentina",
-                "Bolivia (Plurinational State of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Ecuador",
-                "Falkland Islands (Malvinas)",
-                "French Guiana",
-                "Guyana",
-                "Paraguay",
-                "Peru",
-                "Suriname",
-                "Uruguay",
-                "Venezuela (Bolivarian Republic of)",
-                "Bermuda",
-                "Canada",
-                "Greenland",
-                "Saint Pierre and Miquelon",
-                "United States of America",
-                "Australia",
-                "New Zealand",
-                "Fiji",
-                "New Caledonia",
-                "Papua New Guinea",
-                "Solomon Islands",
-                "Vanuatu",
-                "Guam",
-                "Kiribati",
-                "Marshall Islands",
-                "Micronesia (Fed. States of)",
-                "Nauru",
-                "Northern Mariana Islands",
-                "Palau",
-                "American Samoa",
-                "Cook Islands",
-                "French Polynesia",
-                "Niue",
-                "Samoa",
-                "Tokelau",
-                "Tonga",
-                "Tuvalu",
-                "Wallis and Futuna Islands",
-                "Turkey",
-                "Other non-specified areas",
-                "Channel Islands",
-                "Faeroe Islands",
-                "TFYR Macedonia",
-                "Caribbean Netherlands", "Netherlands Antilles",
-                ],
-                [
-                "Algeria",
-                "Angola",
-                "Benin",
-                "Botswana",
-                "Burkina Faso",
-                "Burundi",
-                "Côte d'Ivoire",
-                "Cameroon",
-                "Cabo Verde",
-                "Central African Republic",
-                "Chad",
-                "Comoros",
-                "Congo",
-                "Democratic Republic of the Congo",
-                "Djibouti",
-                "Egypt",
-                "Equatorial Guinea",
-                "Eritrea",
-                "Ethiopia",
-                "Gabon",
-                "Gambia",
-                "Ghana",
-                "Guinea",
-                "Guinea-Bissau",
-                "Kenya",
-                "Lesotho",
-                "Liberia",
-                "Libya",
-                "Madagascar",
-                "Malawi",
-                "Mali",
-                "Mauritania",
-                "Mauritius",
-                "Morocco",
-                "Mozambique",
-                "Namibia",
-                "Niger",
-                "Nigeria",
-                "Réunion",
-                "Rwanda",
-                "Senegal",
-                "Sierra Leone",
-                "Somalia",
-                "South Africa",
-                "Sudan",
-                "Swaziland",
-                "Togo",
-                "Tunisia",
-                "Uganda",
-                "United Republic of Tanzania",
-                "Western Sahara",
-                "Zambia",
-                "Mayotte",
-                "Eswatini",
-                "Sao Tome and Principe",
-                "Zimbabwe",
-                ], 
-                [
-                "China",
-                "China, Hong Kong SAR",
-                "China, Macao SAR",
-                "China, Taiwan Province of China",
-                "Cambodia",
-                "Dem. People's Republic of Korea",
-                "Lao People's Democratic Republic",
-                "Mongolia",
-                "Viet Nam",
-                ], 
-                [
-                "Austria",
-                "Belgium",
-                "Croatia",
-                "Czechia",
-                "Denmark",
-                "France",
-                "Finland",
-                "Spain",
-                "Sweden",
-                "Germany",
-                "Greece",
-                "Iceland",
-                "Ireland",
-                "Italy",
-                "Luxembourg",
-                "Netherlands",
-                "Norway",
-                "Portugal",
-                "Switzerland",
-                "Turkey",
-                "Albania",
-                "Bosnia and Herzegovina",
-                "Bulgaria",
-                "Cyprus",
-                "Estonia",
-                "Hungary",
-                "Latvia",
-                "Lithuania",
-                "Malta",
-                "Montenegro",
-                "North Macedonia",
-                "Poland",
-                "Romania",
-                "Serbia",
-                "Slovakia",
-                "Slovenia",
-                "United Kingdom",
-                ],
-                [
-                "India",
-                "Afghanistan",
-                "Bangladesh",
-                "Bhutan",
-                "Maldives",
-                "Nepal",
-                "Pakistan",
-                "Sri Lanka",
-                ],
-                [
-                "Argentina",
-                "Bahamas",
-                "Barbados",
-                "Belize",
-                "Venezuela (Bolivarian Republic of)",
-                "Brazil",
-                "Chile",
-                "Colombia",
-                "Costa Rica",
-                "Cuba",
-                "Dominican Republic",
-                "Ecuador",
-                "El Salvador",
-                "Guadeloupe",
-                "Guatemala",
-                "Guyana",
-                "Haiti",
-                "Honduras",
-                "Jamaica",
-                "Martinique",
-                "Mexico",
-                "Aruba",
-                "Bonaire, Sint Eustatius and Saba",
-                "Curaçao",
-                "Caribbean Netherlands",
-                "Nicaragua",
-                "Panama",
-                "Paraguay",
-                "Peru",
-                "Puerto Rico",
-                "Suriname",
-                "Trinidad and Tobago",
-                "Uruguay",
-                "Saint Vincent and the Grenadines",
-                "United States Virgin Islands",
-                "French Guiana",
-                "Saint Lucia",
-                "Turks and Caicos Islands",
-                "Grenada",
-                "Bolivia (Plurinational State of)",
-                "Venezuela (Bolivarian Republic of)",
-                ],
-                [
-                "Bahrain",
-                "Iran (Islamic Republic of)",
-                "Iraq",
-                "Israel",
-                "Jordan",
-                "Kuwait",
-                "Lebanon",
-                "Oman",
-                "Qatar",
-                "Saudi Arabia",
-                "Syrian Arab Republic",
-                "United Arab Emirates",
-                "State of Palestine",
-                "Libya",
-                "Yemen"
-                ],
-                [
-                "Canada",
-                "Guam",
-                "United States of America", 
-                ],
-                [
-                "Australia",
-                "Japan",
-                "New Caledonia",
-                "New Zealand",
-                "Samoa",
-                "Solomon Islands",
-                "Tonga",
-                "Micronesia (Fed. States of)",
-                "French Polynesia",
-                "Vanuatu",
-                ],
-                [
-                "Armenia",
-                "Azerbaijan",
-                "Belarus",
-                "Georgia",
-                "Kazakhstan",
-                "Kyrgyzstan",
-                "Republic of Moldova",
-                "Russian Federation",
-                "Tajikistan",
-                "Turkmenistan",
-                "Ukraine",
-                "Uzbekistan",
-                ],
-                [
-                "Brunei Darussalam",
-                "Timor-Leste",
-                "Indonesia",
-                "Malaysia",
-                "Myanmar",
-                "Papua New Guinea",
-                "Philippines",
-                "Republic of Korea",
-                "Singapore",
-                "Thailand",
-                "Fiji",
-                ],
-                ]
-    return dict(zip(IPCCreg,UNreg))
 
+# %%
+# parsed sheets of the UN workbooks, shared by all the readers of this process
+_wpp_cache = {}
+
+def read_wpp_sheets(destination: str, tabs: list, skiprows=16, present_only=False, keep=True):
+    """Reads sheets of a UN World Population Prospects workbook
+    Each sheet is parsed once for each process: parsed sheets are kept in memory
+    and given back to later calls (e.g. from un_tseries2022 and un_tseries)
+    until the workbook changes or clear_wpp_cache is called.
+    The returned dataframes are shared, so they should not be modified in place
+    Receives
+        destination: path of the workbook
+        tabs: list of sheet names to read
+        skiprows: number of rows above the header
+        present_only: if True, sheets which are not in the workbook are left out
+        of the result instead of raising an error
+        keep: if False, newly parsed sheets are not kept in memory
+    Returns
+        sheets: dictionary with sheet names as keys and dataframes as values"""
+    key = (os.path.abspath(destination), skiprows)
+    mtime = os.path.getmtime(destination)
+    if key not in _wpp_cache or _wpp_cache[key]["mtime"] != mtime:
+        _wpp_cache.pop(key, None)
+        cached = {}
+    else:
+        cached = _wpp_cache[key]["sheets"]
+    sheets = {tab: cached[tab] for tab in tabs if tab in cached}
+    missing = [tab for tab in tabs if tab not in cached]
+    if missing:
+        store = wpp_store(destination)
+        if skiprows == 16 and cache_is_fresh(destination, store):
+            names = wpp_sheet_names(destination)
+            for tab in missing:
+                if tab in names or not present_only:
+                    sheets[tab] = read_wpp_store(store, tab)
+        else:
+            # the workbook is opened once for all the missing sheets
+            with pd.ExcelFile(destination) as workbook:
+                if present_only:
+                    missing = [tab for tab in missing if tab in workbook.sheet_names]
+                if missing:
+                    sheets.update(pd.read_excel(workbook, sheet_name=missing, skiprows=skiprows))
+        if keep:
+            _wpp_cache.setdefault(key, {"mtime": mtime, "sheets": {}})["sheets"].update(sheets)
+    return {tab: sheets[tab] for tab in tabs if tab in sheets}
+
+
+def clear_wpp_cache():
+    """Releases the sheets kept in memory by read_wpp_sheets"""
+    _wpp_cache.clear()
+
+
+# %%
+def wpp_store(destination: str):
+    """Returns the folder where ingest_wpp stores the sheets of a workbook:
+    "parquet/<workbook name>" next to the workbook"""
+    folder, filename = os.path.split(destination)
+    return os.path.join(folder, "parquet", os.path.splitext(filename)[0])
+
+
+def normalize_wpp_sheet(data: pd.DataFrame):
+    """Normalizes a sheet of a UN workbook to store it in parquet
+    The region column takes the name used since WPP2017
+    ("Region, subregion, country or area *"), column names become strings
+    and columns mixing numbers and placeholders (e.g. "...") become numeric"""
+    old_region_cols = ["Major area, region, country or area *",
+                       "Major area, region, country or area"]
+    data = data.rename(columns={c: "Region, subregion, country or area *" for c in old_region_cols})
+    data.columns = [str(c) for c in data.columns]
+    for col in data.columns[data.dtypes == object]:
+        values = data[col].dropna()
+        numbers = pd.to_numeric(values, errors="coerce")
+        if len(values) > 0 and numbers.notna().mean() > 0.5:
+            data[col] = pd.to_numeric(data[col], errors="coerce")
+        else:
+            data[col] = data[col].where(data[col].isna(), data[col].astype(str))
+    return data
+
+
+def ingest_wpp(folder=r"data/UN", files=None):
+    """Converts UN World Population Prospects workbooks into parquet files
+    Each sheet of each workbook is read once (16 rows above the header),
+    normalized (see normalize_wpp_sheet) and saved as
+    "folder/parquet/<workbook name>/<sheet name>.parquet".
+    Sheet names are normalized too ("Upper80" becomes "Upper 80").
+    Once a workbook is ingested, un_reading, un_reading2020, un_reading_historical
+    and un_extraction load its sheets from the parquet files, until the workbook changes
+    Receives
+        folder: folder with the UN workbooks
+        files: list of workbooks to convert, None converts all the .xlsx files in folder
+    Returns
+        stores: list of folders with the converted sheets"""
+    if files is None:
+        files = sorted(f for f in os.listdir(folder) if f.endswith(".xlsx"))
+    stores = []
+    for file in files:
+        destination = os.path.join(folder, file)
+        store = wpp_store(destination)
+        if not cache_is_fresh(destination, store):
+            os.makedirs(store, exist_ok=True)
+            for old in os.listdir(store):
+                os.remove(os.path.join(store, old))
+            sheets = pd.read_excel(destination, sheet_name=None, skiprows=16)
+            for tab, data in sheets.items():
+                tab = re.sub(r"^(Lower|Upper)(\d+)$", r"\1 \2", tab.strip())
+                normalize_wpp_sheet(data).to_parquet(os.path.join(store, tab + ".parquet"), index=False)
+            store_signature(destination, store)
+        stores.append(store)
+    return stores
+
+
+def read_wpp_store(store: str, tab: str):
+    """Reads a sheet converted by ingest_wpp,
+    giving back integer names to the year columns"""
+    data = pd.read_parquet(os.path.join(store, tab + ".parquet"))
+    data.columns = [int(c) if c.isdigit() else c for c in data.columns]
+    return data
 
 # %%
+def un_reading_dict(numregions: int, ipccregion: bool, countries: list, estimates=False):
+    """Returns the dictionary of regions used to group UN data
+    Receives
+        numregions: number of IPCC regions (1, 5, 6, 10)
+        ipccregion: boolean, True to group UN data into IPCC regions
+        countries: list of UN countries to aggregate into a "modelregion" if ipccregion is False
+        estimates: True for the definitions used with "Estimates" (un_reading2020),
+        False for the ones used with probabilistic projections (un_reading)"""
+    if ipccregion: #if True, aggregates data into ipcc regions
+        if numregions==1:
+            reg_dict = createIPCC1R()
+        if numregions==5:
+            reg_dict = createIPCC5R()
+        if numregions==6:
+            # Note that for estimates we use the same definition as in IPPC regions
+            # rather than UN aggregation which is used in UN_reading()
+            # We could have used UN aggregation based on createIPCC6Rproj()
+            # but there is a deviation in 2020 too big for 2020
+            reg_dict = createIPCC6R() if estimates else createIPCC6Rproj()
+        if numregions==10:
+            # Note that for estimates we use the UN aggregation based on createIPCC10Rproj()
+            # because this makes it consistent with UN_Reading() for next years
+            reg_dict = createIPCC10Rproj()
+    else: #if false, aggregates data into a "modelregion"
+        reg_dict = dict(zip(["modelregion"], [countries]))
+    return reg_dict
+
+def un_group_tabs(sheets: dict, reg_dict: dict, years: list):
+    """Groups already parsed UN probabilistic sheets (as from read_wpp_sheets)
+    into the regions of reg_dict
+    Returns a dataframe with population (million) as un_reading"""
+    region_col = "Region, subregion, country or area *"
+    tabdata = {}
+    for tab, data in sheets.items():
+        if len(data) > 1:
+            new = data[[region_col] + years]
+            tabdata[tab] = new.rename(columns={region_col: "UNRegion"})
+
+    all_data = []
+    columns = ["IPCCRegion", "UNRegion", "Scenario"] + years
+    for reg in reg_dict.keys():
+        regions = reg_dict[reg]
+        for tab, new in tabdata.items():
+            regdata = pd.DataFrame(new[new.UNRegion.isin(regions)])
+            regdata["Scenario"] = tab
+            regdata["IPCCRegion"] = reg
+            regdata[years] = regdata[years]/1000
+            all_data.append(regdata[columns])
+    all_data = pd.concat(all_data, axis=0) if all_data else pd.DataFrame()
+    return all_data
+
+def un_group_estimates(data: pd.DataFrame, reg_dict: dict, years: float):
+    """Groups the already parsed "Estimates" sheet into the regions of reg_dict
+    for one past year
+    Returns a dataframe with population (million) as un_reading2020"""
+    region_col = "Region, subregion, country or area *"
+    readcol = "Total Population, as of 1 July (thousands)"
+    columns = [region_col] + ["Year"] + [readcol]
+    new = data[columns]
+
+    all_data = pd.DataFrame()
+    new = new.rename(columns={region_col: "UNRegion"})
+    for region in reg_dict.keys():
+        regions = reg_dict[region]
+        regdata = pd.DataFrame(new[new.UNRegion.isin(regions)])
+        newdata = pd.DataFrame()
+        newdata[years] = pd.Series(regdata.loc[regdata.Year == years][readcol].sum()/1000)
+        newdata["Scenario"] = "Estimates"
+        newdata["IPCCRegion"] = region
+        all_data = pd.concat((all_data, 
+                    newdata), axis=0)
+    return all_data
+
 def un_reading(years: list, 
                filename: str, 
                numregions: int, 
@@ -1549,39 +350,10 @@ def un_reading(years: list,
                     "SDMX code**",
                     "Type",
                     "Parent code"]
-    if ipccregion: #if True, aggregates data into ipcc regions
-        if numregions==1:
-            reg_dict = createIPCC1R()
-        if numregions==5:
-            reg_dict = createIPCC5R()
-        if numregions==6:
-            reg_dict = createIPCC6Rproj()
-        if numregions==10:
-            reg_dict = createIPCC10Rproj()
-    else: #if false, aggregates data into a "modelregion"
-        key = "modelregion"
-        reg_dict = dict(zip(["modelregion"], [countries]))
-
+    reg_dict = un_reading_dict(numregions, ipccregion, countries)
+    sheets = read_wpp_sheets(destination, tabs)
+    all_data = un_group_tabs(sheets, reg_dict, years)
 
-    all_data = pd.DataFrame()
-    for reg in reg_dict.keys():
-        regions = reg_dict[reg]
-        for tab in tabs:
-            data = pd.read_excel(destination,tab, skiprows=16)
-
-            if len(data) > 1:
-                region_col = "Region, subregion, country or area *"
-                columns = [region_col] + years
-                new = data[columns]
-                new = new.rename(columns={region_col: "UNRegion"})
-                regdata = pd.DataFrame(new[new.UNRegion.isin(regions)])
-                regdata["Scenario"] = tab
-                regdata["IPCCRegion"] = reg
-                columns = ["IPCCRegion", "UNRegion", "Scenario"] + years
-                regdata[years] = regdata[years]/1000
-                all_data = pd.concat((all_data, 
-                            regdata[columns]), axis=0)
-                
     return (all_data)
 
 def un_reading2020(years: float, 
@@ -1610,42 +382,9 @@ def un_reading2020(years: float,
     folder = r'data/UN'
     filename = "WPP2022_GEN_F01_DEMOGRAPHIC_INDICATORS_REV1.xlsx"
     destination = os.path.join (folder, filename)
-    data = pd.read_excel(destination,"Estimates", skiprows=16)
-    region_col = "Region, subregion, country or area *"
-    readcol = "Total Population, as of 1 July (thousands)"
-    columns = [region_col] + ["Year"] + [readcol]
-    new = data[columns]
-
-    if ipccregion: #if True, aggregates data into ipcc regions
-        if numregions==1:
-            reg_dict = createIPCC1R()
-        if numregions==5:
-            reg_dict = createIPCC5R()
-        if numregions==6:
-            # Note that here we use the same definition as in IPPC regions
-            # rather than UN aggregation which is used in UN_reading()
-            # We could have used UN aggregation based on createIPCC6Rproj()
-            # but there is a deviation in 2020 too big for 2020
-            reg_dict = createIPCC6R() #createIPCC6Rproj()
-        if numregions==10:
-            # Note that here we use the UN aggregation based on createIPCC10Rproj()
-            # because this makes it consistent with UN_Reading() for next years
-            reg_dict = createIPCC10Rproj()
-    else: #if false, aggregates data into a "modelregion"
-        key = "modelregion"
-        reg_dict = dict(zip(["modelregion"], [countries]))
-
-    all_data = pd.DataFrame()
-    new = new.rename(columns={region_col: "UNRegion"})
-    for region in reg_dict.keys():
-        regions = reg_dict[region]
-        regdata = pd.DataFrame(new[new.UNRegion.isin(regions)])
-        newdata = pd.DataFrame()
-        newdata[years] = pd.Series(regdata.loc[regdata.Year == years][readcol].sum()/1000)
-        newdata["Scenario"] = "Estimates"
-        newdata["IPCCRegion"] = region
-        all_data = pd.concat((all_data, 
-                    newdata), axis=0)
+    data = read_wpp_sheets(destination, ["Estimates"])["Estimates"]
+    reg_dict = un_reading_dict(numregions, ipccregion, countries, estimates=True)
+    all_data = un_group_estimates(data, reg_dict, years)
 
     return all_data
 
@@ -1666,6 +405,112 @@ def ipcc_create1R(all_data: pd.DataFrame, years: list):
     owo = pd.DataFrame()
     return (world, regdata, owo)
 
+# UN labels of the IPCC regions, in the order used for the regional dataframes
+IPCC_UNREGION_LABELS = {
+    5: {"R5ASIA": "Eastern, Southern, South-Eastern Asia",
+        "R5LAM": "Latin America",
+        "R5MAF": "Middle East - Africa",
+        "R5OECD90+EU": "OECD",
+        "R5REF": "Reforming Economies"},
+    6: {"R6ASIA": "Eastern, Southern, South-Eastern Asia",
+        "R6LAM": "Latin America",
+        "R6AFRICA": "Africa",
+        "R6MIDDLE_EAST": "Middle East",
+        "R6OECD90+EU": "OECD",
+        "R6REF": "Reformation Regions"},
+    10: {"R10AFRICA": "Africa",
+        "R10CHINA+": "China plus",
+        "R10EUROPE": "Europe",
+        "R10INDIA+": "India plus",
+        "R10LATIN_AM": "Latin America",
+        "R10MIDDLE_EAST": "Middle East",
+        "R10NORTH_AM": "North America",
+        "R10PAC_OECD": "OECD",
+        "R10REF_ECON": "Reforming Economies",
+        "R10REST_ASIA": "Rest of Asia"},
+}
+
+def ipcc_aggregate(all_data: pd.DataFrame, years: list, reg_dict=None, labels=None,
+                   owo_label="OWO"):
+    """Aggregates UN data into any grouping of regions with one matrix product
+    The grouping (a createIPCC*R-style dictionary, e.g. createIPCC5R() or createsids())
+    is compiled into a sparse region x country membership matrix which multiplies
+    the country x (year, scenario) matrix of the UN data
+    Receives
+        all_data: dataframe with UN data (as from un_reading)
+        years: list of years to aggregate
+        reg_dict: dictionary with region names as keys and lists of UN names as values,
+        None uses the IPCCRegion/UNRegion pairs of all_data
+        labels: dictionary with the UNRegion label of each region, its order gives
+        the order of the regional dataframe; None uses reg_dict order and names
+        owo_label: IPCCRegion label of the rest of world
+    Returns three dataframes: world, regional, and other rest of world (owo)
+    World is the aggregation of "WORLD" (taken from all_data if reg_dict has no "WORLD" key)
+    and is empty, as owo, if there is no WORLD data"""
+    sortcolumns = ["IPCCRegion", "UNRegion", "Scenario"] + years
+    if reg_dict is None:
+        pairs = all_data[["IPCCRegion", "UNRegion"]].drop_duplicates()
+        reg_dict = pairs.groupby("IPCCRegion", sort=False)["UNRegion"].apply(list).to_dict()
+    reg_dict = dict(reg_dict)
+    if "WORLD" not in reg_dict:
+        # custom groupings (e.g. createsids()) use the WORLD definition of the data
+        world_members = list(all_data.loc[all_data.IPCCRegion == "WORLD", "UNRegion"].unique())
+        reg_dict["WORLD"] = world_members or ["WORLD"]
+    if labels is None:
+        labels = {reg: reg for reg in reg_dict if reg != "WORLD"}
+    regions = ["WORLD"] + [reg for reg in labels if reg in reg_dict]
+
+    # one row for each UN country (or area) and scenario
+    data = all_data.groupby(["IPCCRegion", "UNRegion", "Scenario"], sort=False)[years].sum()
+    data = data.groupby(level=["UNRegion", "Scenario"]).first()
+    wide = data.unstack("Scenario").fillna(0)
+    countries = {name: c for c, name in enumerate(wide.index)}
+
+    rows, cols = [], []
+    for r, reg in enumerate(regions):
+        members = [countries[name] for name in dict.fromkeys(reg_dict[reg]) if name in countries]
+        rows += [r] * len(members)
+        cols += members
+    membership = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                   shape=(len(regions), len(countries)))
+    found = [reg for r, reg in enumerate(regions) if membership[r].nnz > 0]
+
+    values = membership @ wide.to_numpy(dtype=float)
+    aggregated = pd.DataFrame(values, index=pd.Index(regions, name="IPCCRegion"),
+                              columns=wide.columns).loc[found]
+    aggregated = aggregated.stack("Scenario", future_stack=True).reset_index()
+    aggregated = aggregated.sort_values(["Scenario"], kind="stable")
+    aggregated["order"] = aggregated["IPCCRegion"].map({reg: r for r, reg in enumerate(regions)})
+    aggregated = aggregated.sort_values("order", kind="stable")
+    aggregated["UNRegion"] = aggregated["IPCCRegion"].map(labels).fillna("WORLD")
+
+    world = aggregated[aggregated.IPCCRegion == "WORLD"][sortcolumns].reset_index(drop=True)
+    regdata = aggregated[aggregated.IPCCRegion != "WORLD"][sortcolumns]
+    regdata.index = regdata.groupby("IPCCRegion", sort=False).cumcount().values
+    if len(world) == 0:
+        return (world, regdata, pd.DataFrame())
+
+    owo = rest_of_world(world, regdata, years, owo_label)
+    return (world, regdata, owo)
+
+def rest_of_world(world: pd.DataFrame, regdata: pd.DataFrame, years: list, label="OWO"):
+    """Computes the other rest of world (owo) as WORLD minus the sum of the regions
+    for every scenario and year in one aligned subtraction, clipped at zero
+    Receives
+        world: dataframe with world values, one row per scenario
+        regdata: dataframe with regional values of any grouping of regions
+        years: list of year columns
+        label: IPCCRegion label of the rest of world (e.g. "R5OWO", "R10OWO")
+    Returns a dataframe with the same rows and columns as world"""
+    sums = regdata.groupby("Scenario")[years].sum()
+    sums = sums.reindex(world["Scenario"]).set_axis(world.index)
+    owo = world[years].sub(sums)
+    owo = owo.where(owo > 0, 0)
+    owo["UNRegion"] = "OWO"
+    owo["IPCCRegion"] = label
+    owo["Scenario"] = world["Scenario"]
+    return owo[world.columns]
+
 def ipcc_create6R(all_data: pd.DataFrame, years: list):
     """All_data is a dataframe with UN data for the six regions
     years is list of years to select in dataframe
@@ -1673,208 +518,21 @@ def ipcc_create6R(all_data: pd.DataFrame, years: list):
     and other rest of world data for 6R IPCC 
     R5ROWO is empty
     """
-    sortcolumns = ["IPCCRegion", "UNRegion", "Scenario"] + years
-
-    world = all_data[all_data.IPCCRegion=="WORLD"]
-    world = world.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    world["UNRegion"] = "WORLD"
-    world = world[sortcolumns]
-
-    asia = all_data[all_data.IPCCRegion=="R6ASIA"]
-    asia = asia.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    asia["UNRegion"] = "Eastern, Southern, South-Eastern Asia"
-    asia = asia[world.columns] #re-order columns
-
-    lam = all_data[all_data.IPCCRegion=="R6LAM"]
-    lam = lam.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    lam["UNRegion"] = "Latin America"
-    lam = lam[world.columns] #re-order columns
-
-    maf = all_data[all_data.IPCCRegion=="R6AFRICA"]
-    maf = maf.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    maf["UNRegion"] = "Africa"
-    maf = maf[world.columns] #re-order columns
-
-    med = all_data[all_data.IPCCRegion=="R6MIDDLE_EAST"]
-    med = med.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    med["UNRegion"] = "Middle East"
-    med = med[world.columns] #re-order columns
-
-    oecd = all_data[all_data.IPCCRegion=="R6OECD90+EU"]
-    oecd = oecd.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    oecd["UNRegion"] = "OECD"
-    oecd = oecd[world.columns] #re-order columns
-
-    ref = all_data[all_data.IPCCRegion=="R6REF"]
-    ref = ref.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    ref["UNRegion"] = "Reformation Regions"
-    ref = ref[world.columns] #re-order columns
-
-    regdata = pd.concat((pd.concat((pd.concat((pd.concat((pd.concat((asia, lam)), maf)), med)),oecd)), ref))
-
-    o = regdata.groupby("Scenario")[years].sum().reset_index()
-
-    o["IPCCRegion"] = "Sum IPCC"
-    o["UNRegion"] = "Sum UN"
-
-    wo= pd.concat((world,o))
-    wog = wo.groupby("Scenario")
-    owo = pd.DataFrame()
-
-    for group  in wog:
-        sel = group[1]
-        x = sel.loc[sel["UNRegion"]=="WORLD"][years]-sel.loc[sel["UNRegion"]=="Sum UN"][years]
-        owo = pd.concat((owo, x))
-    owo = owo.where(owo >0,0)
-    owo["UNRegion"] = "OWO"
-    owo["IPCCRegion"] = "R6OWO"
-    owo["Scenario"] = world["Scenario"]
-    owo = owo[world.columns]
-    return (world, regdata, owo)
+    return ipcc_aggregate(all_data, years, labels=IPCC_UNREGION_LABELS[6], owo_label="R6OWO")
 
 def ipcc_create5R(all_data: pd.DataFrame, years: list):
     """All_data is dataframe with all UN data
     years is list of years to select in dataframe
     Returns three dataframe: world, regional,
     and other rest of world data for 5R IPCC"""
-    sortcolumns = ["IPCCRegion", "UNRegion",	"Scenario"] + years
-    world = all_data[all_data.IPCCRegion=="WORLD"]
-    world = world.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    world["UNRegion"] = "WORLD"
-    world = world[sortcolumns]
-
-    asia = all_data[all_data.IPCCRegion=="R5ASIA"]
-    asia = asia.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    asia["UNRegion"] = "Eastern, Southern, South-Eastern Asia"
-    asia = asia[world.columns] #re-order columns
-
-    lam = all_data[all_data.IPCCRegion=="R5LAM"]
-    lam = lam.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    lam["UNRegion"] = "Latin America"
-    lam = lam[world.columns] #re-order columns
-
-    maf = all_data[all_data.IPCCRegion=="R5MAF"]
-    maf = maf.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    maf["UNRegion"] = "Middle East - Africa"
-    maf = maf[world.columns] #re-order columns
-
-    oecd = all_data[all_data.IPCCRegion=="R5OECD90+EU"]
-    oecd = oecd.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    oecd["UNRegion"] = "OECD"
-    oecd = oecd[world.columns] #re-order columns
-
-    ref = all_data[all_data.IPCCRegion=="R5REF"]
-    ref = ref.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    ref["UNRegion"] = "Reforming Economies"
-    ref = ref[world.columns] #re-order columns
-
-    regdata = pd.concat((pd.concat((pd.concat((pd.concat((asia, lam)), maf)),oecd)),ref))
-
-    o = regdata.groupby("Scenario")[years].sum().reset_index()
-
-    o["IPCCRegion"] = "Sum IPCC"
-    o["UNRegion"] = "Sum UN"
-
-    wo= pd.concat((world,o))
-    wog = wo.groupby("Scenario")
-    owo = pd.DataFrame()
-
-    for group  in wog:
-        sel = group[1]
-        x = sel.loc[sel["UNRegion"]=="WORLD"][years]-sel.loc[sel["UNRegion"]=="Sum UN"][years]
-        owo = pd.concat((owo, x))
-    owo = owo.where(owo >0,0)
-    owo["UNRegion"] = "OWO"
-    owo["IPCCRegion"] = "R5OWO"
-    owo["Scenario"] = world["Scenario"]
-    owo = owo[world.columns]
-    return (world, regdata, owo)
+    return ipcc_aggregate(all_data, years, labels=IPCC_UNREGION_LABELS[5], owo_label="R5OWO")
 
 def ipcc_create10R(all_data: pd.DataFrame, years: list):
     """All_data is dataframe with all UN data
     years is list of years to select in dataframe
     Returns three dataframe: world, regional,
     and other rest of world data for 10R IPCC"""
-    sortcolumns = ["IPCCRegion", "UNRegion",	"Scenario"] + years
-    world = all_data[all_data.IPCCRegion=="WORLD"]
-    world = world.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    world["UNRegion"] = "WORLD"
-    world = world[sortcolumns]
-
-    africa = all_data[all_data.IPCCRegion=="R10AFRICA"]
-    africa = africa.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    africa["UNRegion"] = "Africa"
-    africa = africa[world.columns] #re-order columns
-
-    china = all_data[all_data.IPCCRegion=="R10CHINA+"]
-    china = china.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    china["UNRegion"] = "China plus"
-    china = china[world.columns] #re-order columns
-
-    euro = all_data[all_data.IPCCRegion=="R10EUROPE"]
-    euro = euro.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    euro["UNRegion"] = "Europe"
-    euro = euro[world.columns] #re-order columns
-
-    india = all_data[all_data.IPCCRegion=="R10INDIA+"]
-    india = india.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    india["UNRegion"] = "India plus"
-    india = india[world.columns] #re-order columns
-
-    lam = all_data[all_data.IPCCRegion=="R10LATIN_AM"]
-    lam = lam.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    lam["UNRegion"] = "Latin America"
-    lam = lam[world.columns] #re-order columns
-
-    meast = all_data[all_data.IPCCRegion=="R10MIDDLE_EAST"]
-    meast = meast.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    meast["UNRegion"] = "Middle East"
-    meast = meast[world.columns] #re-order columns
-
-    northam = all_data[all_data.IPCCRegion=="R10NORTH_AM"]
-    northam = northam.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    northam["UNRegion"] = "North America"
-    northam = northam[world.columns] #re-order columns
-
-    pac = all_data[all_data.IPCCRegion=="R10PAC_OECD"]
-    pac = pac.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    pac["UNRegion"] = "OECD"
-    pac = pac[world.columns] #re-order columns
-
-    ref = all_data[all_data.IPCCRegion=="R10REF_ECON"]
-    ref = ref.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    ref["UNRegion"] = "Reforming Economies"
-    ref = ref[world.columns] #re-order columns
-
-    rasia = all_data[all_data.IPCCRegion=="R10REST_ASIA"]
-    rasia= rasia.groupby(["IPCCRegion", "Scenario"])[years].sum().reset_index()
-    rasia["UNRegion"] = "Rest of Asia"
-    rasia= rasia[world.columns] #re-order columns
-
-    regdata = pd.concat((pd.concat((pd.concat((africa,china)), euro)), india))
-    regdata = pd.concat((pd.concat((regdata,lam)), meast))
-    regdata = pd.concat((pd.concat((regdata,northam)), pac))    
-    regdata = pd.concat((pd.concat((regdata,ref)), rasia))
-
-    o = regdata.groupby("Scenario")[years].sum().reset_index()
-
-    o["IPCCRegion"] = "Sum IPCC"
-    o["UNRegion"] = "Sum UN"
-
-    wo= pd.concat((world,o))
-    wog = wo.groupby("Scenario")
-    owo = pd.DataFrame()
-
-    for group  in wog:
-        sel = group[1]
-        x = sel.loc[sel["UNRegion"]=="WORLD"][years]-sel.loc[sel["UNRegion"]=="Sum UN"][years]
-        owo = pd.concat((owo, x))
-    owo = owo.where(owo >0,0)
-    owo["UNRegion"] = "OWO"
-    owo["IPCCRegion"] = "R5OWO"
-    owo["Scenario"] = world["Scenario"]
-    owo = owo[world.columns]
-    return (world, regdata, owo)
+    return ipcc_aggregate(all_data, years, labels=IPCC_UNREGION_LABELS[10], owo_label="R10OWO")
 
 # %%
 def un_tseries2022 (years, filename, numregions, ipccregion, countries):
@@ -1899,7 +557,44 @@ def un_tseries2022 (years, filename, numregions, ipccregion, countries):
     """
     ryears =[y for y in years if y != 2020]
     all_data = un_reading(ryears, filename, numregions, ipccregion, countries)
+    w2020 = None
+    if 2020 in years:
+        w2020 = un_reading2020(2020, filename, numregions, ipccregion, countries)
+
+    return un_tseries_combine(all_data, w2020, years, numregions, ipccregion, countries)
+
+def un_tseries2022_batch(years, filename, resolutions):
+    """Creates the un_tseries2022 tuples for several IPCC resolutions of the
+    same UN revision, reading the projection and "Estimates" sheets once
+    Receives:
+    years: list of years (greater or equal than 2023), 2020 taken from "Estimates"
+    filename: name of a file with probabilistic projections
+    resolutions: list of numbers of IPCC regions (1, 5, 6, 10)
 
+    Returns a dictionary with a (w, r, o) tuple for each resolution
+    """
+    ryears =[y for y in years if y != 2020]
+    tabs = ["Lower 95", "Lower 80", "Median", "Upper 80", "Upper 95"]
+    sheets = read_wpp_sheets(os.path.join("data/UN", filename), tabs)
+    if 2020 in years:
+        estimates = os.path.join("data/UN", "WPP2022_GEN_F01_DEMOGRAPHIC_INDICATORS_REV1.xlsx")
+        estimates = read_wpp_sheets(estimates, ["Estimates"])["Estimates"]
+
+    results = {}
+    for numregions in resolutions:
+        all_data = un_group_tabs(sheets, un_reading_dict(numregions, True, None), ryears)
+        w2020 = None
+        if 2020 in years:
+            reg_dict = un_reading_dict(numregions, True, None, estimates=True)
+            w2020 = un_group_estimates(estimates, reg_dict, 2020)
+        results[numregions] = un_tseries_combine(all_data, w2020, years, numregions, True, None)
+    return results
+
+def un_tseries_combine(all_data, w2020, years, numregions, ipccregion, countries):
+    """Groups the UN data of un_reading into (w, r, o) and adds 2020
+    from the un_reading2020 data w2020 (None if 2020 is not in years)
+    Used by un_tseries2022 and un_tseries2022_batch"""
+    ryears =[y for y in years if y != 2020]
     if ipccregion:
         if numregions==1:
             w, r, o = ipcc_create1R(all_data, ryears)
@@ -1919,8 +614,7 @@ def un_tseries2022 (years, filename, numregions, ipccregion, countries):
         r = pd.DataFrame()
         o = pd.DataFrame()        
 
-    if 2020 in years:
-        w2020 = un_reading2020(2020, filename, numregions, ipccregion, countries)
+    if w2020 is not None:
         if ipccregion:
             w[2020] = w2020.loc[w2020.IPCCRegion == "WORLD"][2020].values[0]
         else:
@@ -1941,45 +635,9 @@ def un_tseries2022 (years, filename, numregions, ipccregion, countries):
                 new = new[sortcolumns]
                 all_regions = pd.concat((all_regions, new))
             r = all_regions
-            if numregions==4:
-                o[2020] = w2020.loc[w2020.IPCCRegion == "WORLD"][2020].values[0] - (
-                        + w2020.loc[w2020.IPCCRegion == "R5ASIA"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5LAM"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5MAF"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5OECD90+EU"][2020].values[0]
-                )
-            if numregions==5:
-                o[2020] = w2020.loc[w2020.IPCCRegion == "WORLD"][2020].values[0] - (
-                        + w2020.loc[w2020.IPCCRegion == "R5ASIA"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5LAM"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5MAF"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5OECD90+EU"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R5REF"][2020].values[0]
-                )
-            if numregions==6:
-                o[2020] = w2020.loc[w2020.IPCCRegion == "WORLD"][2020].values[0] - (
-                        + w2020.loc[w2020.IPCCRegion == "R6ASIA"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R6LAM"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R6AFRICA"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R6MIDDLE_EAST"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R6OECD90+EU"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R6REF"][2020].values[0]
-                )
-
-            if numregions==10:
-                o[2020] = w2020.loc[w2020.IPCCRegion == "WORLD"][2020].values[0] - (
-                        + w2020.loc[w2020.IPCCRegion == "R10AFRICA"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10CHINA+"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10EUROPE"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10INDIA+"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10LATIN_AM"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10MIDDLE_EAST"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10NORTH_AM"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10PAC_OECD"][2020].values[0]
-                        + w2020.loc[w2020.IPCCRegion == "R10REF_ECON"][2020].values[0]   
-                        + w2020.loc[w2020.IPCCRegion == "R10REST_ASIA"][2020].values[0]                    
-                )
-            o[2020] = o[2020].where(o[2020] >0, 0)         
+            regions2020 = w2020[w2020.IPCCRegion.isin(r.IPCCRegion)]
+            owo2020 = rest_of_world(w2020[w2020.IPCCRegion == "WORLD"], regions2020, [2020])
+            o[2020] = owo2020[2020].values[0]
             o = o[sortcolumns]
     
     return (w, r, o)
@@ -2029,15 +687,68 @@ def un_tseries (years, filename, numregions, ipccregion, countries):
     return (w, r, o)
 
 # %%
-def un_extraction (rex: str, years: list):
+def wpp_sheet_names(destination: str):
+    """Returns the names of the sheets of a UN workbook,
+    from the parquet store when it is up to date, otherwise from the
+    workbook index (without parsing the sheets)"""
+    store = wpp_store(destination)
+    if cache_is_fresh(destination, store):
+        return [os.path.splitext(f)[0] for f in os.listdir(store) if f.endswith(".parquet")]
+    with pd.ExcelFile(destination) as workbook:
+        return workbook.sheet_names
+
+
+def un_extract_rows(data: pd.DataFrame, tab: str, rexs: list, years: list, variant: str):
+    """Extracts the rows of the selected regions from one parsed sheet of a UN workbook
+    Returns a list with a dataframe having one row for each region found in the sheet"""
+    data_col = "Total Population, as of 1 July (thousands)"
+    region_col = "Region, subregion, country or area *"
+    columns = [str(y) for y in years] + ["Region", "Scenario","Variant"]
+    extracted = []
+    if len(data) > 1:
+        # one pivot from long (Year) to wide format for all the regions
+        regdata = data.loc[data[region_col].isin(rexs) & data["Year"].isin(years),
+                           [region_col, "Year", data_col]]
+        regdata = regdata.drop_duplicates([region_col, "Year"])
+        new = regdata.pivot(index=region_col, columns="Year", values=data_col)
+        found = [region for region in rexs if region in new.index]
+        new = new.reindex(index=found, columns=years)
+        new.columns = [str(y) for y in years]
+        new["Scenario"] = tab
+        new["Region"] = new.index
+        new["Variant"] = variant
+        extracted.append(new[columns].reset_index(drop=True))
+    return extracted
+
+
+def un_extract_workbook(destination: str, tabs: list, rexs: list, years: list, variant: str,
+                        keep=True):
+    """Extracts the rows of the selected regions from the sheets of a UN workbook,
+    which are parsed together in one read (used by un_extraction, also in worker processes)
+    Sheets which are not in the workbook are skipped
+    Returns a list with a dataframe for each sheet, in the order of tabs"""
+    sheets = read_wpp_sheets(destination, tabs, present_only=True, keep=keep)
+    extracted = []
+    for tab, data in sheets.items():
+        extracted += un_extract_rows(data, tab, rexs, years, variant)
+    return extracted
+
+
+def un_extraction (rex, years: list, parallel=False, keep_sheets=True):
     """Extracts future years estimates of deterministic population
     Values are in million inhabitants"""
     """Receives:
-    - rex: region name (native UN region)
+    - rex: region name (native UN region) or list of region names,
+    so that one pass over the workbooks serves all the regions
     - years: list of years to consider
+    - parallel: if True, the workbooks are read in a process pool
+    - keep_sheets: if False, the parsed sheets are not kept in memory by read_wpp_sheets
+    (clear_wpp_cache releases the ones already kept)
+    All the sheets of a workbook are parsed in one read;
+    sheets which are not in a workbook are skipped
     Returns:
     all: dataframe with all population scenarios (deterministic)
-    for the selected region"""
+    for the selected regions"""
     path = "data/UN"
     tabs = ["Medium variant", "High variant", 
             "Low variant", "Constant-fertility", 
@@ -2053,39 +764,100 @@ def un_extraction (rex: str, years: list):
             "WPP2019_GEN_DEMOGRAPHIC_INDICATORS.xlsx",
             "WPP2022_GEN_F01_DEMOGRAPHIC_INDICATORS_REV1.xlsx"]
 
-    columns = [str(y) for y in years] + ["Region", "Scenario","Variant"]
     revision = ["2010", "2012", "2015", "2017", "2019", "2022"]
-    all_data = pd.DataFrame()
+    rexs = [rex] if isinstance(rex, str) else list(rex)
+
+    jobs = []
     for file in files:
         destination = os.path.join(path,file)
-        data_col = "Total Population, as of 1 July (thousands)"
-        region_col = "Region, subregion, country or area *"
-        year = "Year"
-        for tab in tabs:
-            data = pd.read_excel(destination, tab, skiprows=16)
-            if len(data) > 1:
-                regions = list(set(data[region_col]))
-                if rex in regions:
-                    current_year = revision[files.index(file)]
-                    variant = "revision_" + current_year
-                    region = rex
-                    regdata = data.loc[data[region_col]== region]
-                    new = pd.DataFrame()
-                    for n in years:
-                        datasel = pd.DataFrame(regdata.loc[regdata["Year"]==n][data_col].values)
-                        new[str(n)] = datasel
-                    new["Scenario"] = tab
-                    new["Region"] = region
-                    new["Variant"] = variant
-
-                    all_data = pd.concat((all_data, 
-                                new[columns]), axis=0)
-                            
+        variant = "revision_" + revision[files.index(file)]
+        jobs.append((destination, tabs, rexs, years, variant, keep_sheets))
+
+    if parallel:
+        with ProcessPoolExecutor() as executor:
+            extracted = list(executor.map(un_extract_workbook, *zip(*jobs)))
+    else:
+        extracted = [un_extract_workbook(*job) for job in jobs]
+    extracted = [new for workbook in extracted for new in workbook]
+    all_data = pd.concat(extracted, axis=0) if extracted else pd.DataFrame()
+
     all = all_data.copy(deep=True)
-    all[all.columns[:9] ]= all[all.columns[:9]]/1000
+    syears = [str(y) for y in years]
+    if len(all) > 0:
+        all[syears] = all[syears]/1000
 
     return (all)
 
+
+def build_un_cube(years: list, regions=None, dest=r"data/UN/un_cube", parallel=False):
+    """Builds a cube of UN deterministic population across the revisions 2010-2022
+    with axes (revision, variant, region, year) from one un_extraction pass,
+    saved as a .npy file with the labels of the axes in a json sidecar,
+    so that it can be opened memory-mapped with open_un_cube
+    Values are in million inhabitants, NaN where a variant or region is missing
+    Receives
+        years: list of years
+        regions: list of UN region names, None for all the names of
+        the "Medium variant" sheet of the 2022 revision
+        dest: path of the cube without extension ("dest.npy" and "dest_labels.json")
+        parallel: as in un_extraction
+    Returns
+        dest: path of the cube without extension"""
+    if regions is None:
+        destination = os.path.join("data/UN", "WPP2022_GEN_F01_DEMOGRAPHIC_INDICATORS_REV1.xlsx")
+        data = read_wpp_sheets(destination, ["Medium variant"])["Medium variant"]
+        regions = list(data["Region, subregion, country or area *"].dropna().unique())
+    syears = [str(y) for y in years]
+    data = un_extraction(list(regions), years, parallel)
+
+    r_codes, revisions = pd.factorize(data["Variant"], sort=True)
+    v_codes, variants = pd.factorize(data["Scenario"])
+    g_codes = pd.Index(regions).get_indexer(data["Region"])
+    cube = np.full((len(revisions), len(variants), len(regions), len(years)), np.nan)
+    cube[r_codes, v_codes, g_codes, :] = data[syears].to_numpy(dtype=float)
+
+    np.save(dest + ".npy", cube)
+    labels = {"revisions": [r.replace("revision_", "") for r in revisions],
+              "variants": list(variants),
+              "regions": list(regions),
+              "years": [int(y) for y in years]}
+    with open(dest + "_labels.json", "w") as f:
+        json.dump(labels, f)
+    return dest
+
+
+def open_un_cube(dest=r"data/UN/un_cube"):
+    """Opens the cube created by build_un_cube as a read-only memory map
+    Returns
+        cube: memory map with axes (revision, variant, region, year)
+        labels: dictionary with the lists "revisions", "variants", "regions" and "years" """
+    cube = np.load(dest + ".npy", mmap_mode="r")
+    with open(dest + "_labels.json") as f:
+        labels = json.load(f)
+    return cube, labels
+
+
+def un_cube_slice(cube: np.ndarray, labels: dict, variant="Medium variant", region=None, year=None):
+    """Selects a variant (and optionally a region and a year) from the cube without copying
+    Returns an array with the remaining axes, e.g. (revision, region, year) for a variant"""
+    index = [slice(None), labels["variants"].index(variant), slice(None), slice(None)]
+    if region is not None:
+        index[2] = labels["regions"].index(region)
+    if year is not None:
+        index[3] = labels["years"].index(int(year))
+    return cube[tuple(index)]
+
+
+def un_revision_drift(cube: np.ndarray, labels: dict, year: int, variant="Medium variant", relative=False):
+    """Returns the drift of every region across the UN revisions for one year and variant:
+    a dataframe indexed by region with one column per revision holding the difference
+    to the latest revision (million inhabitants), or the ratio minus one if relative is True"""
+    values = un_cube_slice(cube, labels, variant, year=year)
+    latest = values[-1]
+    drift = values / latest - 1 if relative else values - latest
+    return pd.DataFrame(drift.T, index=pd.Index(labels["regions"], name="Region"),
+                        columns=labels["revisions"])
+
 # %%
 def un_reading_historical(years: float, filename: str, numregions: int, ipccregion: bool, countries: list):
     """Estimates UN deterministic values in million inhab for historical years
@@ -2101,7 +873,7 @@ def un_reading_historical(years: float, filename: str, numregions: int, ipccregi
         scenario is the "Estimate" scenario of UN"""
     folder = r'data/UN'
     destination = os.path.join (folder, filename)
-    data = pd.read_excel(destination,"Estimates", skiprows=16)
+    data = read_wpp_sheets(destination, ["Estimates"])["Estimates"]
     region_col = "Region, subregion, country or area *"
     readcol = "Total Population, as of 1 July (thousands)"
     columns = [region_col] + ["Year"] + [readcol]
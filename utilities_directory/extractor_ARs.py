@@ -5,10 +5,296 @@ import io
 import itertools
 import math
 import os
+import json
+import hashlib
+import csv
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 np.seterr(invalid='ignore')
 
+NON_YEAR_COL = ["Model", "Scenario", "Region", "Variable", "Unit"]
+AR_YEARS = [str(y) for y in range(2010, 2105, 5)]
+AR_FILES = {"AR5": "AR5_Scenario_Database.csv",
+            "SR15": "IAMC15_Scenario_Database.csv",
+            "AR6": "AR6_Scenarios_Database_World_v1.1.csv"}
+AR_REGIONAL_FILES = {"R5": "AR6_Scenarios_Database_R5_regions_v1.1.csv",
+                     "R6": "AR6_Scenarios_Database_R6_regions_v1.1.csv",
+                     "R10": "AR6_Scenarios_Database_R10_regions_v1.1.csv"}
+
 # %%
-def nonharmARsextractor(folder: "str"):
+def file_signature(file: "str", hashing=True):
+    """Returns a dictionary identifying the content of a source file
+    Receives
+    file: "str" with the path of the file
+    hashing: if True, the sha256 hash of the file is also calculated
+    Returns
+    signature: "dict" with size (bytes), mtime and sha256 of the file"""
+    stat = os.stat(file)
+    signature = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if hashing:
+        sha = hashlib.sha256()
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        signature["sha256"] = sha.hexdigest()
+    return signature
+
+
+def store_signature(file: "str", cachefile: "str"):
+    """Stores the signature of the source file next to its cache
+    in "cachefile.json"""
+    with open(cachefile + ".json", "w") as f:
+        json.dump(file_signature(file), f)
+
+
+def write_cache(data, file: "str", cachefile: "str"):
+    """Writes data into cachefile (pickle for ".pkl", otherwise parquet)
+    and stores the signature of the source file
+    If the folder cannot be written (e.g. a read-only data volume)
+    the cache is skipped and the data are used as parsed
+    Returns
+    True if the cache was written"""
+    try:
+        if cachefile.endswith(".pkl"):
+            pd.to_pickle(data, cachefile)
+        else:
+            data.to_parquet(cachefile, index=False)
+        store_signature(file, cachefile)
+    except OSError:
+        return False
+    return True
+
+
+def cache_is_fresh(file: "str", cachefile: "str"):
+    """Checks if cachefile was built from the current version of file
+    Size and mtime are compared first; if only the mtime changed
+    the hash decides, so a touched but unchanged file keeps its cache
+    Receives
+    file: "str" with the path of the source file
+    cachefile: "str" with the path of the cache
+    Returns
+    True if the cache can be used, False if it has to be rebuilt"""
+    keyfile = cachefile + ".json"
+    if not (os.path.exists(cachefile) and os.path.exists(keyfile)):
+        return False
+    with open(keyfile) as f:
+        stored = json.load(f)
+    current = file_signature(file, hashing=False)
+    if current["size"] != stored.get("size"):
+        return False
+    if current["mtime"] == stored.get("mtime"):
+        return True
+    if file_signature(file)["sha256"] != stored.get("sha256"):
+        return False
+    try:
+        store_signature(file, cachefile)
+    except OSError:
+        pass
+    return True
+
+
+# operators of the row filters of read_cached, as in pyarrow
+FILTER_OPS = {"in": lambda c, v: c.isin(v), "not in": lambda c, v: ~c.isin(v),
+              "==": lambda c, v: c == v, "=": lambda c, v: c == v, "!=": lambda c, v: c != v}
+
+
+def filter_rows(data: "pd.DataFrame", filters=None):
+    """Keeps the rows of data matching all the (column, op, value) filters,
+    with op among FILTER_OPS, e.g. [("Variable", "in", ["Population"])]"""
+    if not filters:
+        return data
+    keep = np.ones(len(data), dtype=bool)
+    for column, op, value in filters:
+        keep &= FILTER_OPS[op](data[column], value).values
+    return data.loc[keep].reset_index(drop=True)
+
+
+def read_cached(file: "str", cache=True, columns=None, filters=None,
+                title=True, encoding="latin1"):
+    """Reads a csv file (by default an IPCC database, with title-cased columns)
+    On first load the parsed data are converted into a parquet file
+    stored next to the csv file ("file.parquet"), which is used by later
+    calls until the csv file changes
+    Receives
+    file: "str" with the path of the csv file
+    cache: if True, reads and writes the parquet cache
+    columns: list of (title-cased) columns to return, None returns all
+    filters: list of (column, op, value) row filters with op among FILTER_OPS,
+    pushed down to the parquet reader when the cache is used
+    title: if True, the column names are title-cased
+    encoding: encoding of the csv file
+    Returns
+    data: "pd.DataFrame" with the columns of the csv file"""
+    for column, op, value in filters or []:
+        if op not in FILTER_OPS:
+            raise ValueError("Unsupported filter operator %r, use one of %s" % (op, list(FILTER_OPS)))
+    cachefile = os.path.splitext(file)[0] + ".parquet"
+    if cache and cache_is_fresh(file, cachefile):
+        return pd.read_parquet(cachefile, columns=columns, filters=filters or None)
+    data = pd.read_csv(file, encoding=encoding, low_memory=False)
+    if title:
+        data.columns = [str.title(s) for s in data.columns]
+    if cache:
+        write_cache(data, file, cachefile)
+    data = filter_rows(data, filters)
+    if columns is not None:
+        data = pd.DataFrame(data[columns])
+    return data
+
+
+def row_selection(variables=None, regions=None):
+    """Returns a dictionary with the lists of values to keep for the columns
+    Variable and Region; a single name is accepted as a list with one name
+    and None keeps all (the column is left out)"""
+    selection = {"Variable": variables, "Region": regions}
+    return {k: [v] if isinstance(v, str) else list(v)
+            for k, v in selection.items() if v is not None}
+
+
+def iter_chunks(file: "str", non_year_col: list, years: list,
+                variables=None, regions=None, cache=True, chunksize=100000):
+    """Reads an IPCC database in chunks of rows keeping only the selected
+    columns and rows, so that only one chunk is in memory at a time
+    Chunks come from the parquet cache when it is up to date, otherwise
+    from the csv file parsed with only the needed columns and explicit dtypes
+    Receives
+    file: "str" with the path of the csv file
+    non_year_col: list of label columns to keep
+    years: list of years (as strings) to keep
+    variables: variable or list of variables to keep, None keeps all
+    regions: region or list of regions to keep, None keeps all
+    cache: if True, uses the parquet cache when it is up to date
+    chunksize: number of rows read at a time
+    Yields
+    chunk: "pd.DataFrame" with the selected rows and columns of a chunk"""
+    selection = row_selection(variables, regions)
+    columns = non_year_col + years
+
+    cachefile = os.path.splitext(file)[0] + ".parquet"
+    if cache and cache_is_fresh(file, cachefile):
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(cachefile).iter_batches(batch_size=chunksize, columns=columns)
+        reader = (batch.to_pandas() for batch in batches)
+    else:
+        header = pd.read_csv(file, encoding="latin1", nrows=0).columns
+        titles = dict(zip(header, [str.title(s) for s in header]))
+        usecols = [c for c in header if titles[c] in columns]
+        dtypes = {c: (str if titles[c] in non_year_col else "float64") for c in usecols}
+        reader = pd.read_csv(file, encoding="latin1", usecols=usecols, dtype=dtypes,
+                             chunksize=chunksize)
+        reader = (chunk.rename(columns=titles) for chunk in reader)
+
+    for chunk in reader:
+        keep = np.ones(len(chunk), dtype=bool)
+        for k, v in selection.items():
+            keep &= chunk[k].isin(v).values
+        yield chunk.loc[keep, columns]
+
+
+def read_selection(file: "str", non_year_col: list, years: list,
+                   variables=None, regions=None, cache=True, chunksize=100000):
+    """Reads only the selected variables, regions and years of an IPCC database
+    If a fresh parquet cache exists the selection is pushed down to the parquet reader,
+    otherwise the csv file is parsed in chunks with only the needed columns
+    and each chunk is filtered before being kept
+    Receives
+    file: "str" with the path of the csv file
+    non_year_col: list of label columns to keep
+    years: list of years (as strings) to keep
+    variables: variable or list of variables to keep, None keeps all
+    regions: region or list of regions to keep, None keeps all
+    cache: if True, uses the parquet cache when it is up to date
+    chunksize: number of csv rows parsed at a time
+    Returns
+    data: "pd.DataFrame" with the selected rows and columns"""
+    selection = row_selection(variables, regions)
+    columns = non_year_col + years
+
+    cachefile = os.path.splitext(file)[0] + ".parquet"
+    if cache and cache_is_fresh(file, cachefile):
+        filters = [(k, "in", v) for k, v in selection.items()]
+        return pd.read_parquet(cachefile, columns=columns, filters=filters or None)
+
+    chunks = iter_chunks(file, non_year_col, years, variables, regions, False, chunksize)
+    data = pd.concat(chunks, axis=0, ignore_index=True)
+    return data
+
+
+def reading(file, non_year_col, years, name, cache=True,
+            variables=None, regions=None, chunksize=100000):
+    """Reads an IPCC database and keeps the selected years
+    adding the name of the report in column "Report"
+    If variables or regions are given, only those rows are read
+    Without the parquet cache only the needed columns are parsed"""
+    if variables is None and regions is None and cache:
+        # the whole file is parsed once to build the cache, later calls read the cache
+        data = read_cached(file, cache, non_year_col + years)
+    else:
+        data = read_selection(file, non_year_col, years, variables, regions,
+                              cache, chunksize)
+    data.insert(loc=0, column="Report", value=name)
+    return (data)
+
+def read_reports(files, names, non_year_col, years, cache=True,
+                 variables=None, regions=None, chunksize=100000, parallel=False):
+    """Reads a list of IPCC database files, one dataframe for each file
+    If parallel is True, files are parsed concurrently in a process pool,
+    one process for each file
+    Returns
+    ARsdata: list of "pd.DataFrame" in the same order as files"""
+    arguments = [(file, non_year_col, years, names[f], cache, variables, regions, chunksize)
+                 for f, file in enumerate(files)]
+    if not parallel:
+        return [reading(*args) for args in arguments]
+    with ProcessPoolExecutor(max_workers=len(files)) as executor:
+        ARsdata = list(executor.map(reading, *zip(*arguments)))
+    return ARsdata
+
+def compact_frames(ARsdata: list, years: list):
+    """Reduces the memory used by the dataframes of the IPCC databases
+    Label columns are converted into categoricals sharing the same categories
+    across all the dataframes, so they can still be compared and concatenated,
+    and year columns are converted into float32
+    Receives
+    ARsdata: list of "pd.DataFrame" as returned by the extractors
+    years: list of year columns
+    Returns
+    compacted: list of "pd.DataFrame" with compact dtypes"""
+    labels = ["Report"] + NON_YEAR_COL
+    dtypes = {}
+    for col in labels:
+        values = pd.concat([pd.Series(data[col].dropna().unique()) for data in ARsdata])
+        dtypes[col] = pd.CategoricalDtype(sorted(set(values.astype(str))))
+    dtypes.update({year: "float32" for year in years})
+    compacted = []
+    for data in ARsdata:
+        data = data.astype({col: dtypes[col] for col in data.columns if col in dtypes})
+        compacted.append(data)
+    return compacted
+
+
+def memory_report(ARsdata: list, names: list):
+    """Reports the memory used by each dataframe
+    Receives
+    ARsdata: list of "pd.DataFrame"
+    names: list of names of the dataframes (e.g. ["AR5", "SR15", "AR6"])
+    Returns
+    report: "pd.DataFrame" with number of rows and memory (MB) of the label columns,
+    of the year columns and in total for each dataframe"""
+    labels = ["Report"] + NON_YEAR_COL
+    report = []
+    for data in ARsdata:
+        usage = data.memory_usage(deep=True, index=False)
+        label_mem = usage[usage.index.isin(labels)].sum()
+        report.append([len(data), label_mem / 1e6, (usage.sum() - label_mem) / 1e6, usage.sum() / 1e6])
+    report = pd.DataFrame(report, index=names,
+                          columns=["Rows", "Labels (MB)", "Years (MB)", "Total (MB)"])
+    return report
+
+# %%
+def nonharmARsextractor(folder: "str", cache=True, variables=None, regions=None,
+                        years=None, chunksize=100000, parallel=False,
+                        compact=False):
     """Create a dataframe for each IPPC global database
     The assessment reports (ARs) databases are stored in csv files in the data folder
     with these names
@@ -17,63 +303,36 @@ def nonharmARsextractor(folder: "str"):
     AR5 in "folder/AR5_Scenario_Database.csv",
     SR 1.5 "folder/IAMC15_Scenario_Database.csv",
     AR6 "folder/AR6_Scenarios_Database_World_v1.1.csv"
+    cache: if True, the csv files are converted on first load into parquet files
+    stored next to them, and later calls read the parquet files
+    variables: variable or list of variables to keep (e.g. ["Population"]), None keeps all
+    regions: region or list of regions to keep, None keeps all
+    years: list of years to keep, None keeps 2010-2100 every 5 years
+    chunksize: number of csv rows parsed at a time when variables or regions are selected
+    Variables, regions and years are filtered while reading, so memory
+    depends on the selected data rather than on the whole database
+    parallel: if True, the three files are parsed at the same time in a process pool
+    compact: if True, label columns are stored as categoricals shared by the three
+    dataframes and year columns as float32 (see memory_report to check the savings)
     Returns
     ar5: "pd.DataFrame" with the AR5 database with original period disaggregation
     ar15: "pd.DataFrame" with the SR 1.5 database with original period disaggregation
     ar6: "pd.DataFrame" with the AR6 database with original period disaggregation
     """
 
-    non_year_col = ["Model", "Scenario", "Region", "Variable", "Unit"]
-    years   =    ["2010",
-                "2015",
-                "2020",
-                "2025", 
-                "2030", 
-                "2035", 
-                "2040", 
-                "2045", 
-                "2050", 
-                "2055", 
-                "2060", 
-                "2065", 
-                "2070", 
-                "2075", 
-                "2080",
-                "2085",
-                "2090",
-                "2095",
-                "2100"]
-
-    names = ["AR5", "SR15", "AR6"]
-    def reading(file,non_year_col, years, name):
-        data = pd.read_csv(file, encoding="latin1")
-        oldcolumns = [s for s in data.columns]
-        newcolumns = [str.title(s) for s in oldcolumns]
-        data.columns = newcolumns
-        data["Report"] = name
-        newcolumns = ["Report"] + non_year_col + years
-        data = data[newcolumns]
-        return (data)
-    
-    files = [
-            "AR5_Scenario_Database.csv",
-            "IAMC15_Scenario_Database.csv",
-            "AR6_Scenarios_Database_World_v1.1.csv"]
+    non_year_col = NON_YEAR_COL
+    if years is None:
+        years = AR_YEARS
+    years = [str(y) for y in years]
+
+    names = list(AR_FILES.keys())
+    files = list(AR_FILES.values())
 
     files = [folder + "/" + file for file in files]
-    ARsdata = []
-    for f,file in enumerate(files):
-        name = names[f]
-        ARsdata.append(reading(file,non_year_col, years, name))
-
-    varvalues=pd.DataFrame()
-    var_list = ["Population",
-                "GDP|PPP",
-                "GDP|MER",
-                "Emissions|CO2", 
-                "Final Energy", 
-                "Secondary Energy|Electricity", 
-                "Primary Energy"]
+    ARsdata = read_reports(files, names, non_year_col, years, cache,
+                           variables, regions, chunksize, parallel)
+    if compact:
+        ARsdata = compact_frames(ARsdata, years)
 
     ar5=ARsdata[0]
     ar15=ARsdata[1]
@@ -82,7 +341,9 @@ def nonharmARsextractor(folder: "str"):
     return ar5, ar15, ar6
 
 
-def nonharmARregsextractor(folder: "str"):
+def nonharmARregsextractor(folder: "str", cache=True, variables=None, regions=None,
+                           years=None, chunksize=100000, parallel=False,
+                           compact=False):
     """Create a dataframe from AR6 IPPC regional database
     The assessment reports (ARs) databases are stored in csv files in the data folder
     with these names
@@ -93,63 +354,36 @@ def nonharmARregsextractor(folder: "str"):
         "AR6_Scenarios_Database_R5_regions_v1.1.csv",
         "AR6_Scenarios_Database_R6_regions_v1.1.csv",
         "AR6_Scenarios_Database_R10_regions_v1.1.csv"
+    cache: if True, the csv files are converted on first load into parquet files
+    stored next to them, and later calls read the parquet files
+    variables: variable or list of variables to keep (e.g. ["Population"]), None keeps all
+    regions: region or list of regions to keep, None keeps all
+    years: list of years to keep, None keeps 2010-2100 every 5 years
+    chunksize: number of csv rows parsed at a time when variables or regions are selected
+    Variables, regions and years are filtered while reading, so memory
+    depends on the selected data rather than on the whole database
+    parallel: if True, the three files are parsed at the same time in a process pool
+    compact: if True, label columns are stored as categoricals shared by the three
+    dataframes and year columns as float32 (see memory_report to check the savings)
     Returns
     ar6reg5HI: "pd.DataFrame" with the 5regionAR6 database with original period disaggregation
     ar6reg6HI: "pd.DataFrame" with the 6-region AR6 database with original period disaggregation
     ar6reg10HI: "pd.DataFrame" with the 10-region AR6 database with original period disaggregation
     """
-    non_year_col = ["Model", "Scenario", "Region", "Variable", "Unit"]
-    years   =    ["2010",
-                "2015",
-                "2020",
-                "2025", 
-                "2030", 
-                "2035", 
-                "2040", 
-                "2045", 
-                "2050", 
-                "2055", 
-                "2060", 
-                "2065", 
-                "2070", 
-                "2075", 
-                "2080",
-                "2085",
-                "2090",
-                "2095",
-                "2100"]
+    non_year_col = NON_YEAR_COL
+    if years is None:
+        years = AR_YEARS
+    years = [str(y) for y in years]
 
     names = ["AR6", "AR6", "AR6"]
-    def reading(file,non_year_col, years, name):
-        data = pd.read_csv(file, encoding="latin1")
-        oldcolumns = [s for s in data.columns]
-        newcolumns = [str.title(s) for s in oldcolumns]
-        data.columns = newcolumns
-        data["Report"] = name
-        newcolumns = ["Report"] + non_year_col + years
-        data = data[newcolumns]
-        return (data)
-    
-    files = [
-            "AR6_Scenarios_Database_R5_regions_v1.1.csv",
-            "AR6_Scenarios_Database_R6_regions_v1.1.csv",
-            "AR6_Scenarios_Database_R10_regions_v1.1.csv"]
+    files = list(AR_REGIONAL_FILES.values())
 
     files = [folder + "/" + file for file in files]
             
-    ARsdata = []
-    for f,file in enumerate(files):
-        name = names[f]
-        ARsdata.append(reading(file,non_year_col, years, name))
-
-    varvalues=pd.DataFrame()
-    var_list = ["Population",
-                "GDP|PPP",
-                "GDP|MER",
-                "Emissions|CO2", 
-                "Final Energy", 
-                "Secondary Energy|Electricity", 
-                "Primary Energy"]
+    ARsdata = read_reports(files, names, non_year_col, years, cache,
+                           variables, regions, chunksize, parallel)
+    if compact:
+        ARsdata = compact_frames(ARsdata, years)
 
     ar6reg5HI=ARsdata[0]
     ar6reg6HI=ARsdata[1]
@@ -158,30 +392,373 @@ def nonharmARregsextractor(folder: "str"):
     return ar6reg5HI, ar6reg6HI, ar6reg10HI
 
 
+
+def iter_ARregs_variables(folder: "str", resolution="R10", regions=None, variables=None,
+                          years=None, cache=True, chunksize=100000):
+    """Streams an AR6 regional database one variable at a time
+    The file is read once in chunks; the rows of each variable are written
+    to a temporary file, then each variable is read back and yielded
+    so that memory holds one chunk or one variable, never the whole database
+    Receives
+    folder: "str" with the name of the folder where the ARs are stored
+    resolution: regional database to stream ("R5", "R6" or "R10")
+    regions: region or list of regions to keep, None keeps all
+    variables: variable or list of variables to keep, None keeps all
+    years: list of years to keep, None keeps 2010-2100 every 5 years
+    cache: if True, chunks are read from the parquet cache when it is up to date
+    chunksize: number of rows read at a time
+    Yields
+    (variable, data): name of the variable and "pd.DataFrame" with its rows
+    in the same format as nonharmARregsextractor
+    Example:
+        for variable, data in iter_ARregs_variables("data", "R10", regions=["R10AFRICA"]):
+            ..."""
+    if years is None:
+        years = AR_YEARS
+    years = [str(y) for y in years]
+    file = folder + "/" + AR_REGIONAL_FILES[resolution]
+    dtypes = dict(zip(NON_YEAR_COL + years, [str] * len(NON_YEAR_COL) + ["float64"] * len(years)))
+
+    with tempfile.TemporaryDirectory() as spill:
+        paths = {}
+        for chunk in iter_chunks(file, NON_YEAR_COL, years, variables, regions, cache, chunksize):
+            for variable, group in chunk.groupby("Variable", sort=False):
+                if variable not in paths:
+                    paths[variable] = os.path.join(spill, str(len(paths)) + ".csv")
+                    group.to_csv(paths[variable], index=False)
+                else:
+                    group.to_csv(paths[variable], mode="a", header=False, index=False)
+
+        for variable, path in paths.items():
+            data = pd.read_csv(path, dtype=dtypes, float_precision="round_trip")
+            os.remove(path)
+            data.insert(loc=0, column="Report", value="AR6")
+            yield variable, data
+
+
+class ARdatabase:
+    """Lazy handle on the IPCC databases stored in folder
+    Each report is read only when it is first accessed, then kept in memory
+    until released. Reports are accessed by key or by attribute:
+        db = ARdatabase("data")
+        db["AR6"], db.ar5, db.sr15
+    With regional=True the handle gives the AR6 regional databases:
+        db = ARdatabase("data", regional=True)
+        db["R10"], db.r5
+    Receives
+    folder: "str" with the name of the folder where the ARs are stored
+    regional: if True, handles the R5, R6 and R10 AR6 databases
+    options: keyword arguments of nonharmARsextractor
+    (cache, variables, regions, years, chunksize, compact)
+    With compact=True the categories are built for each report separately"""
+
+    def __init__(self, folder: "str", regional=False, **options):
+        self.folder = folder
+        self.regional = regional
+        self.files = AR_REGIONAL_FILES if regional else AR_FILES
+        years = options.pop("years", None)
+        self.years = [str(y) for y in (AR_YEARS if years is None else years)]
+        self.compact = options.pop("compact", False)
+        self.options = options
+        self._data = {}
+
+    def _key(self, name):
+        key = str(name).upper().replace(" ", "").replace(".", "")
+        if key not in self.files:
+            raise KeyError(f"{name} is not one of {list(self.files)}")
+        return key
+
+    def __getitem__(self, name):
+        key = self._key(name)
+        if key not in self._data:
+            label = "AR6" if self.regional else key
+            file = self.folder + "/" + self.files[key]
+            data = reading(file, NON_YEAR_COL, self.years, label, **self.options)
+            if self.compact:
+                data = compact_frames([data], self.years)[0]
+            self._data[key] = data
+        return self._data[key]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name):
+        try:
+            self._key(name)
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        return list(self.files)
+
+    @property
+    def loaded(self):
+        """List of reports currently in memory"""
+        return list(self._data)
+
+    def release(self, name=None):
+        """Frees the memory of one report, or of all reports if name is None"""
+        if name is None:
+            self._data.clear()
+        else:
+            self._data.pop(self._key(name), None)
+
+    def __repr__(self):
+        return f"ARdatabase({self.folder!r}, reports={self.keys()}, loaded={self.loaded})"
+
+
+
+# %%
+def build_longstore(ARsdata: list):
+    """Creates a single long-format store from the dataframes of the extractors
+    with one row for each report, model, scenario, region, variable and year
+    The store is indexed by a sorted MultiIndex
+    (Report, Variable, Region, Year, Model, Scenario), so that lookups by
+    report, variable, region and year use binary search instead of boolean masks
+    Receives
+    ARsdata: list of "pd.DataFrame" as returned by nonharmARsextractor
+    or nonharmARregsextractor (e.g. [ar5, ar15, ar6])
+    Returns
+    store: "pd.DataFrame" with columns Unit and Value"""
+    index = ["Report", "Variable", "Region", "Year", "Model", "Scenario"]
+    id_vars = ["Report"] + NON_YEAR_COL
+    longdata = []
+    for data in ARsdata:
+        data = data.melt(id_vars=id_vars, var_name="Year", value_name="Value")
+        data = data.dropna(subset=["Value"])
+        data["Year"] = data["Year"].astype(int)
+        longdata.append(data.astype({col: str for col in id_vars}))
+    store = pd.concat(longdata, axis=0, ignore_index=True)
+    store = store.set_index(index).sort_index()
+    return store
+
+
+def save_longstore(store: pd.DataFrame, path: "str"):
+    """Saves the long-format store in a parquet file"""
+    store.reset_index().to_parquet(path, index=False)
+
+
+def load_longstore(path: "str"):
+    """Loads the long-format store saved by save_longstore
+    Returns
+    store: "pd.DataFrame" with the sorted MultiIndex of build_longstore"""
+    index = ["Report", "Variable", "Region", "Year", "Model", "Scenario"]
+    store = pd.read_parquet(path).set_index(index)
+    if not store.index.is_monotonic_increasing:
+        store = store.sort_index()
+    return store
+
+
+def longstore_lookup(store: pd.DataFrame, report: "str", variable: "str",
+                     region=None, year=None):
+    """Selects the values of a variable from the long-format store
+    Receives
+    store: "pd.DataFrame" created by build_longstore or load_longstore
+    report: name of the report (e.g. "AR6")
+    variable: name of the variable (e.g. "Population")
+    region: name of the region, None for all regions
+    year: year (int) or list of years, None for all years
+    Returns
+    data: "pd.DataFrame" with Unit and Value by Model and Scenario
+    (and by Region and Year when they are not selected)"""
+    key = (report, variable,
+           slice(None) if region is None else region,
+           slice(None) if year is None else year)
+    data = store.loc[key, :]
+    fixed = [level for level, k in zip(store.index.names, key)
+             if not isinstance(k, (slice, list)) and level in data.index.names]
+    return data.droplevel(fixed)
+
+
+
+# %%
+def build_valuecube(folder: "str", dest=None, variables=None, years=None, cache=True):
+    """Converts the AR6 world database into a dense float32 cube
+    with axes (model-scenario, variable, year), saved as a .npy file with
+    the labels of the axes in a json sidecar, so that it can be opened
+    memory-mapped with open_valuecube. Missing values are NaN
+    Receives
+    folder: "str" with the name of the folder where the ARs are stored
+    dest: path of the cube without extension, default "folder/AR6_cube"
+    (the files are "dest.npy" and "dest_labels.json")
+    variables: variable or list of variables to keep, None keeps all
+    years: list of years to keep, None keeps 2010-2100 every 5 years
+    cache: if True, the database is read through the parquet cache
+    Returns
+    dest: path of the cube without extension"""
+    if years is None:
+        years = AR_YEARS
+    years = [str(y) for y in years]
+    if dest is None:
+        dest = os.path.join(folder, "AR6_cube")
+    file = folder + "/" + AR_FILES["AR6"]
+    data = reading(file, NON_YEAR_COL, years, "AR6", cache, variables)
+
+    s_codes, scenarios = pd.MultiIndex.from_frame(data[["Model", "Scenario"]]).factorize()
+    v_codes, variable_names = pd.factorize(data["Variable"])
+    cube = np.full((len(scenarios), len(variable_names), len(years)), np.nan, dtype="float32")
+    cube[s_codes, v_codes, :] = data[years].to_numpy(dtype="float32")
+    units = data.groupby("Variable", sort=False)["Unit"].first()
+
+    np.save(dest + ".npy", cube)
+    labels = {"scenarios": [list(s) for s in scenarios],
+              "variables": list(variable_names),
+              "years": [int(y) for y in years],
+              "units": list(units.reindex(variable_names).fillna(""))}
+    with open(dest + "_labels.json", "w") as f:
+        json.dump(labels, f)
+    return dest
+
+
+def open_valuecube(dest: "str"):
+    """Opens the cube created by build_valuecube as a read-only memory map
+    Slices of the cube are views on the file, so they are not copied
+    and the same file can be shared by several processes
+    Receives
+    dest: path of the cube without extension
+    Returns
+    cube: "np.memmap" with axes (model-scenario, variable, year)
+    labels: "dict" with lists "scenarios" ([model, scenario] pairs),
+    "variables", "years" and "units" of the axes"""
+    cube = np.load(dest + ".npy", mmap_mode="r")
+    with open(dest + "_labels.json") as f:
+        labels = json.load(f)
+    return cube, labels
+
+
+def valuecube_slice(cube: np.ndarray, labels: dict, variable: "str", year=None):
+    """Selects a variable (and optionally a year) from the cube without copying
+    Receives
+    cube, labels: as returned by open_valuecube
+    variable: name of the variable
+    year: year (int) to select, None for all years
+    Returns
+    values: array (model-scenario, year) or (model-scenario) if year is given"""
+    v = labels["variables"].index(variable)
+    if year is None:
+        return cube[:, v, :]
+    return cube[:, v, labels["years"].index(int(year))]
+
+
+
 # %%
-def readmeta(folder: "str"):
+def build_rowindex(file: "str", cache=True):
+    """Indexes the rows of an IPCC database csv file by variable and region
+    The file is scanned once and, for each row, the byte offset and length
+    are recorded, so that query can read the rows of a (Variable, Region) pair
+    without parsing the whole file. The index is stored next to the csv file
+    in "file.rowindex.parquet" and rebuilt when the csv file changes
+    Rows are expected on a single line each, as in the IIASA csv exports
+    Receives
+    file: "str" with the path of the csv file
+    cache: if True, reads and writes the stored index
+    Returns
+    index: "pd.DataFrame" with columns Offset and Length, indexed by
+    a sorted MultiIndex (Variable, Region)"""
+    indexfile = os.path.splitext(file)[0] + ".rowindex.parquet"
+    if cache and cache_is_fresh(file, indexfile):
+        index = pd.read_parquet(indexfile)
+    else:
+        with open(file, "rb") as f:
+            header = f.readline()
+            names = [str.title(s) for s in next(csv.reader([header.decode("latin1")]))]
+            v, r = names.index("Variable"), names.index("Region")
+            rows = []
+            offset = len(header)
+            for line in f:
+                fields = next(csv.reader([line.decode("latin1")]), [])
+                # blank lines are skipped, as pandas does
+                if fields:
+                    rows.append((fields[v], fields[r], offset, len(line)))
+                offset += len(line)
+        index = pd.DataFrame(rows, columns=["Variable", "Region", "Offset", "Length"])
+        if cache:
+            write_cache(index, file, indexfile)
+    index = index.set_index(["Variable", "Region"]).sort_index()
+    return index
+
+
+def query(report: "str", variable, region, years=None, folder="data", cache=True):
+    """Reads the rows of selected variables and regions directly from the csv file
+    of a report, seeking to the byte offsets recorded by build_rowindex
+    Receives
+    report: "AR5", "SR15", "AR6" for the world databases,
+    "R5", "R6", "R10" for the AR6 regional databases
+    variable: name or list of names of the variables
+    region: name or list of names of the regions
+    years: list of years to keep, None keeps 2010-2100 every 5 years
+    folder: "str" with the name of the folder where the ARs are stored
+    cache: if True, the row index is stored and reused
+    Returns
+    data: "pd.DataFrame" with the same columns as the extractors"""
+    if years is None:
+        years = AR_YEARS
+    years = [str(y) for y in years]
+    if report in AR_FILES:
+        file, name = folder + "/" + AR_FILES[report], report
+    else:
+        file, name = folder + "/" + AR_REGIONAL_FILES[report], "AR6"
+    variables = [variable] if isinstance(variable, str) else list(variable)
+    regions = [region] if isinstance(region, str) else list(region)
+
+    index = build_rowindex(file, cache)
+    keys = pd.MultiIndex.from_product([variables, regions])
+    rows = index[index.index.isin(keys)].sort_values("Offset")
+
+    with open(file, "rb") as f:
+        content = [f.readline()]
+        # contiguous rows are read with a single seek
+        block = (rows["Offset"] != (rows["Offset"] + rows["Length"]).shift()).cumsum()
+        for _, group in rows.groupby(block.values):
+            f.seek(group["Offset"].iloc[0])
+            content.append(f.read(int(group["Length"].sum())))
+
+    header = pd.read_csv(io.BytesIO(content[0]), encoding="latin1", nrows=0).columns
+    titles = dict(zip(header, [str.title(s) for s in header]))
+    usecols = [c for c in header if titles[c] in NON_YEAR_COL + years]
+    dtypes = {c: (str if titles[c] in NON_YEAR_COL else "float64") for c in usecols}
+    data = pd.read_csv(io.BytesIO(b"".join(content)), encoding="latin1",
+                       usecols=usecols, dtype=dtypes)
+    data = data.rename(columns=titles)[NON_YEAR_COL + years]
+    data.insert(loc=0, column="Report", value=name)
+    return data
+
+
+# %%
+def readmeta(folder: "str", cache=True):
     """Create a dataframe with selected metadata:
     dataframe with number and name of projects by report
     plus dataframe with model scenarios by project
+    The workbook is opened once and all the sheets are parsed in one pass
     Receives
     folder: "str" with the name of the folder where the ARs are stored
+    cache: if True, the parsed sheets are stored in "folder/IAMstat.pkl"
+    and read from there until IAMstat.xlsx changes
     Reuturns
     scenarios: "pd.DataFrame" with the number 
     othermeta[0]: name of projects in AR5
     othermeta[1]: name of projects in SR15
     othermeta[2]: name of projects in AR6"""
     file=os.path.join(folder, "IAMstat.xlsx")
-    tabs=["allscen"]
-    for tab in tabs:
-        scenarios=pd.read_excel(file,tab)
+    cachefile=os.path.join(folder, "IAMstat.pkl")
     tabs = ["AR5modprj", "SR15modprj","AR6modprj"]
     dataset=["AR5", "SR 1.5", "AR6"]
+    if cache and cache_is_fresh(file, cachefile):
+        sheets=pd.read_pickle(cachefile)
+    else:
+        sheets=pd.read_excel(file, sheet_name=["allscen"] + tabs)
+        if cache:
+            write_cache(sheets, file, cachefile)
+    scenarios=sheets["allscen"]
     othermeta=[]
     for tab in tabs:
-        data=pd.read_excel(file,tab)
+        data=pd.DataFrame(sheets[tab])
         data.insert(loc=0, column="Report", value=dataset[tabs.index(tab)])
         othermeta.append(data)
     return (scenarios,othermeta[0], othermeta[1], othermeta[2])
-
-
-
@@ -0,0 +1,23 @@
+import functools
+import json
+import os
+
+# region definitions (IPCC groupings, SIDs, LDCs, LLDCs and the SSP mappings)
+# are read from regions.json the first time they are needed
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json")
+
+@functools.lru_cache(maxsize=None)
+def read_region_definitions():
+    """Returns the dictionary of regions.json, read once per process
+    The returned dictionary is shared, use region_definition to get a copy"""
+    with open(REGIONS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def region_definition(name: str):
+    """Returns a copy of one entry of regions.json (e.g. "IPCC5R", "SIDs", "SSP_scenarios")
+    so that callers can modify it freely"""
+    definition = read_region_definitions()[name]
+    if isinstance(definition, list):
+        return list(definition)
+    return {key: list(value) if isinstance(value, list) else value
+            for key, value in definition.items()}
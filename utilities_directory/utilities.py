@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import hashlib
 import os
 
 import scipy.stats as stats
@@ -8,51 +9,64 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from scipy.stats.mstats import trim as trim
+try:
+    from .extractor_ARs import read_cached
+    from .region_definitions import region_definition
+except ImportError:
+    from extractor_ARs import read_cached
+    from region_definitions import region_definition
 
 
-def transformUN(indata: pd.DataFrame, region: str, rename: bool):
-    
+# labels of UN probabilistic projections as cumulative probability numbers
+UN_PERCENTILES = {"Lower 80": "20", "Lower 95": "5", "Median": "50", "Upper 80": "80", "Upper 95": "95"}
+
+def transformUNall(indata: pd.DataFrame, rename: bool):
+
     """Transforms United Nations (UN) data having horizontal series
-    of years into a vertical series of years. It receives:
+    of years into a vertical series of years for all the regions at once.
+    It receives:
     indata: dataframe of probabilistic/deterministic UN data where
     data for each year is a new column
-    region: name of the region selected
     rename: if True, raw labels would be changes into corresponding
     cumulative probability numbers
     select True for UN probability projections
-    
-    Returns: DataFrame with data for each years on rows
-    with columns Population, Sccenario, Years"""
 
-    ddata = pd.DataFrame(indata.loc[indata.IPCCRegion==region])
+    Returns: DataFrame indexed by IPCCRegion with data for each year on rows
+    with columns Year, Population, Scenario (and UNRegion if in indata),
+    scenario by scenario for each region"""
 
-    if "Variant" in ddata.columns:
-        ddata = ddata.drop("Variant", axis=1)
+    ddata = indata.drop(columns="Variant", errors="ignore").reset_index(drop=True)
+    id_columns = [c for c in ["IPCCRegion", "UNRegion", "Scenario"] if c in ddata.columns]
+    ddata["row"] = ddata.index
 
-    columns = ddata.Scenario.to_list()
+    wnew = ddata.melt(id_vars=id_columns + ["row"], var_name="Year", value_name="Population")
+    wnew = wnew.sort_values("row", kind="stable").drop(columns="row")
 
-    wt = ddata.transpose()
+    if rename:
+        wnew["Scenario"] = wnew["Scenario"].replace(UN_PERCENTILES)
 
-    wt = wt.reset_index()
+    columns = ["Year", "Population", "Scenario"] + [c for c in ["UNRegion"] if c in id_columns]
+    return wnew.set_index("IPCCRegion")[columns]
 
-    wtt = wt[3:]
+def transformUN(indata: pd.DataFrame, region: str, rename: bool):
     
-    wtt.columns = ["year"] + columns
+    """Transforms United Nations (UN) data having horizontal series
+    of years into a vertical series of years. It receives:
+    indata: dataframe of probabilistic/deterministic UN data where
+    data for each year is a new column,
+    or a frame already transformed by transformUNall
+    region: name of the region selected
+    rename: if True, raw labels would be changes into corresponding
+    cumulative probability numbers
+    select True for UN probability projections
     
-    wnew = pd.DataFrame()
-    for c, col in enumerate(columns):
-        data = pd.DataFrame(wtt[wtt.columns[0]])
-        data = data.rename(columns={data.columns[0]: "Year"})
-        data["Population"] = wtt[wtt.columns[c+1]]
-        data["Scenario"] = wtt.columns[c+1]
-        wnew = pd.concat((wnew, data), axis=0)
+    Returns: DataFrame with data for each years on rows
+    with columns Year, Population, Scenario"""
 
-    if rename:
-        change={"Lower 80": "20", "Lower 95": "5", "Median": "50", "Upper 80": "80", "Upper 95": "95"}
-        for ch in change.keys():
-            wnew["Scenario"] = wnew["Scenario"].replace(ch, change[ch])
-                    
-    return (wnew)
+    if indata.index.name != "IPCCRegion":
+        indata = transformUNall(indata.loc[indata.IPCCRegion==region], rename)
+    wnew = indata.loc[indata.index == region, ["Year", "Population", "Scenario"]]
+    return wnew.reset_index(drop=True)
 
 def transformUNminmax(indata: pd.DataFrame, region: str, rename: bool, remove: list):
 
@@ -76,106 +90,118 @@ def transformUNminmax(indata: pd.DataFrame, region: str, rename: bool, remove: l
     undata = pd.DataFrame(undata.loc[undata.Scenario.isin(sel_series)])
     return undata, sel_series
 
-def transformAR(indata: pd.DataFrame, region: str, dataset: str, threshold: tuple, years: list,
-                variable: str, renamevariable: str):
+def transformAR(indata: pd.DataFrame, region, dataset: str, threshold: tuple, years: list,
+                variable, renamevariable: str):
 
     """Transforms indata from assessment reports
     (ARs) from having years in columns to having years in rows
     indata: dataframe of AR data where data for each year is a new column
-    region: name of a region selected
+    region: name of a region selected, or list of regions
     dataset: label to rename the series (e.g. AR6)
-    threshold: ranges used to filter out the data using quantiles
+    threshold: ranges used to filter out the data using quantiles,
+    computed for each variable, region and year
     years: list of years to represent
+    variable: name of the variable selected, or list of variables
 
-    Returns: DataFrame of AR data with columns renamevariable (i.e. Population or GDP), Region, Series, Year, Unit, string Year
+    Returns: DataFrame of AR data with columns renamevariable (i.e. Population or GDP), Unit, Year, string Year, Series
+    and Region (Variable) when a list of regions (variables) is given
     """
-    ar = pd.DataFrame(indata.loc[indata.Variable == variable])
-    ared = pd.DataFrame(ar.loc[ar.Region == region])
-    arnew = pd.DataFrame()
-    for year in years:
-        data = pd.DataFrame(np.vstack((ared[str(year)], ared["Unit"])).transpose(), columns = [renamevariable, "Unit"])
-        data["Year"] = year
-        data["sYear"] = str(year)
-        low = data[renamevariable].quantile(threshold[0])
-        high = data[renamevariable].quantile(threshold[1])
-        data = pd.DataFrame(data.loc[data[renamevariable] >= low])
-        data = pd.DataFrame(data.loc[data[renamevariable] < high])
-        data["Series"] = dataset
-        arnew = pd.concat((arnew,data))
-    return arnew
-
-def transformSSP(indata, region, years, variable):
+    regions = [region] if isinstance(region, str) else list(region)
+    variables = [variable] if isinstance(variable, str) else list(variable)
+    syears = [str(year) for year in years]
+
+    ared = indata.loc[indata.Variable.isin(variables) & indata.Region.isin(regions)]
+    arnew = ared.melt(id_vars=["Variable", "Region", "Unit"], value_vars=syears,
+                      var_name="sYear", value_name=renamevariable)
+    arnew[renamevariable] = pd.to_numeric(arnew[renamevariable])
+    arnew["Year"] = arnew["sYear"].map(dict(zip(syears, years)))
+    arnew.index = arnew.groupby("sYear", sort=False).cumcount().to_numpy()
+
+    values = arnew.groupby(["Variable", "Region", "sYear"])[renamevariable]
+    low = values.transform("quantile", threshold[0])
+    high = values.transform("quantile", threshold[1])
+    arnew = pd.DataFrame(arnew.loc[(arnew[renamevariable] >= low) & (arnew[renamevariable] < high)])
+    arnew["Series"] = dataset
+
+    columns = [renamevariable, "Unit", "Year", "sYear", "Series"]
+    if not isinstance(region, str):
+        columns.append("Region")
+    if not isinstance(variable, str):
+        columns.append("Variable")
+    return arnew[columns]
+
+# order of the SSP scenarios in the vertical series
+SSP_SCENARIOS = ["SSP1", "SSP2", "SSP3", "SSP4", "SSP5", "Historical Reference"]
+
+def transformSSPall(indata, years, variable):
 
     """Transforms Shared Socio-economic Pathways (SSP)
     data from years in horizontal series to years in vertical series
+    for all the models, scenarios and regions with one groupby and one melt
     indata: DataFrame with SSP population, following IPCC region conventions
-    region: selected IPCC region
     years: selected years
     variable: Population
 
-    Returns: DataFrame with columns sYears, Population, Model, Scenario
+    Returns: DataFrame indexed by IPCCRegion with columns Year, Population, Model, Scenario
+    (without Model if it is not in indata), sorted by model, scenario and year
     """
     syears = [str(y) for y in years]
+    keys = [c for c in ["Model", "Scenario", "IPCCRegion"] if c in indata.columns]
 
-    if "Model" in indata.columns:
-        columns = ["Model"] + ["Scenario"] + ["IPCCRegion"] + syears
-
-        indata = indata.groupby(["Model", "Scenario","IPCCRegion"])[syears].sum().reset_index()
-
-        wout = pd.DataFrame()
-        models = list(set(indata.Model))
-        scenarios = ["SSP1", "SSP2", "SSP3", "SSP4", "SSP5", "Historical Reference"]
-        scenarios = [sc for sc in scenarios if sc in indata.Scenario.unique()]
-        for model in models:
-            for scenario in scenarios:
-                wt = pd.DataFrame(indata.loc[(indata.IPCCRegion == region) 
-                                & (indata.Model == model) 
-                                & (indata.Scenario==scenario)])
-                
-                wt = wt[columns]
-                wt.columns = ["Model", "Scenario", "IPCCRegion"] + syears
-                wtt = wt.transpose()
-                wts =  pd.DataFrame(wtt.loc[wtt.index.isin(syears)])
-                wts.columns = [variable]
-                wts["Model"] = model
-                wts["Scenario"] = scenario
-                wts["Year"] = years
-                wout = pd.concat((wout, wts))
-        wout = wout.reset_index()
-        wout = wout.drop(columns=["index"])
-        wout = wout[["Year", variable, "Model", "Scenario"]]
-    else:
-        columns = ["Scenario"] + ["IPCCRegion"] + syears
-
-        indata = indata.groupby(["Scenario","IPCCRegion"])[syears].sum().reset_index()
-
-        wout = pd.DataFrame()
-
-        scenarios = ["SSP1", "SSP2", "SSP3", "SSP4", "SSP5", "Historical Reference"]
-        scenarios = [sc for sc in scenarios if sc in indata.Scenario.unique()]
-
-        for scenario in scenarios:
-            wt = pd.DataFrame(indata.loc[(indata.IPCCRegion == region) 
-                            & (indata.Scenario==scenario)])
-            
-            wt = wt[columns]
-            wt.columns = ["Scenario", "IPCCRegion"] + syears
-            wtt = wt.transpose()
-            wts =  pd.DataFrame(wtt.loc[wtt.index.isin(syears)])
-            wts.columns = [variable]
-            wts["Scenario"] = scenario
-            wts["Year"] = years
-            wout = pd.concat((wout, wts))
-        wout = wout.reset_index()
-        wout = wout.drop(columns=["index"])
-        wout = wout[["Year", variable, "Scenario"]]
-    return (wout)
-
-def readSSP(years: list):
+    indata = indata.groupby(keys)[syears].sum().reset_index()
+    indata = indata.loc[indata.Scenario.isin(SSP_SCENARIOS)]
+
+    wout = indata.melt(id_vars=keys, value_vars=syears, var_name="Year", value_name=variable)
+    wout["scenario_order"] = wout["Scenario"].map({sc: i for i, sc in enumerate(SSP_SCENARIOS)})
+    wout["year_order"] = wout["Year"].map({y: i for i, y in enumerate(syears)})
+    wout["Year"] = wout["Year"].map(dict(zip(syears, years)))
+    order = ["IPCCRegion"] + [c for c in ["Model"] if c in keys] + ["scenario_order", "year_order"]
+    wout = wout.sort_values(order, kind="stable")
+
+    columns = ["Year", variable] + [c for c in ["Model"] if c in keys] + ["Scenario"]
+    return wout.set_index("IPCCRegion")[columns]
+
+def transformSSP(indata, region, years, variable):
+
+    """Transforms Shared Socio-economic Pathways (SSP)
+    data from years in horizontal series to years in vertical series
+    indata: DataFrame with SSP population, following IPCC region conventions,
+    or a frame already transformed by transformSSPall
+    region: selected IPCC region
+    years: selected years
+    variable: Population
+
+    Returns: DataFrame with columns Year, Population, Model, Scenario
+    """
+    if indata.index.name != "IPCCRegion":
+        indata = transformSSPall(indata.loc[indata.IPCCRegion == region], years, variable)
+    wout = indata.loc[indata.index == region]
+    return wout.reset_index(drop=True)
+
+# transformed SSP frames of transformSSPcached, the oldest is dropped after _ssp_cache_size
+_ssp_cache = {}
+_ssp_cache_size = 16
+
+def transformSSPcached(indata, years, variable):
+
+    """Same as transformSSPall, cached on the content of indata, years and variable
+    so that figures regenerated from the same SSP frame transform it once
+    The returned dataframe is shared, do not modify it"""
+    content = pd.util.hash_pandas_object(indata, index=True).to_numpy()
+    key = (hashlib.sha1(content.tobytes()).hexdigest(), tuple(indata.columns),
+           tuple(str(y) for y in years), variable)
+    if key not in _ssp_cache:
+        if len(_ssp_cache) >= _ssp_cache_size:
+            _ssp_cache.pop(next(iter(_ssp_cache)))
+        _ssp_cache[key] = transformSSPall(indata, years, variable)
+    return _ssp_cache[key]
+
+def readSSP(years: list, cache=True):
 
     """Read Shared Socioeconomic Pathays data from folder data\SSP
     Receives:
     - years: list of years 
+    - cache: if True, the SSP database is read through a parquet cache
     Returns:
     SSPpop: A dataframe with SSP population
     SSPgdp: A dataframe with SSP GDP,
@@ -189,257 +215,19 @@ def readSSP(years: list):
     sspfile = "SspDb_country_data_2013-06-12.csv"
     folder = r'data/SSP'
     incodes = pd.read_csv(os.path.join(folder, codefile))
-    SSP = pd.read_csv(os.path.join(folder, sspfile))
+    SSP = read_cached(os.path.join(folder, sspfile), cache, title=False, encoding=None,
+                      filters=[("VARIABLE", "in", ["Population", "GDP|PPP"])])
 
     SSP["Country"] = SSP["REGION"]
     columns = SSP.columns[:5].to_list() +["Country"] + [str(y) for y in years]
     SSP = SSP[columns]
-    regions = list(set(SSP["REGION"]))
     incodes.columns = ["ISO", "Country"]
 
-    keys=list(incodes.ISO)
-    values=list(incodes.Country)
-    codes = {k:values[keys.index(k)] for k in keys}
-
-    UNreg  =       ["Burundi",
-                    "Comoros",
-                    "Djibouti",
-                    "Eritrea",
-                    "Ethiopia",
-                    "Kenya",
-                    "Madagascar",
-                    "Malawi",
-                    "Mauritius",
-                    "Mayotte",
-                    "Mozambique",
-                    "Réunion",
-                    "Rwanda",
-                    "Seychelles",
-                    "Somalia",
-                    "South Sudan",
-                    "Uganda",
-                    "United Republic of Tanzania",
-                    "Zambia",
-                    "Zimbabwe",
-                    "Angola",
-                    "Cameroon",
-                    "Central African Republic",
-                    "Chad",
-                    "Congo",
-                    "Democratic Republic of the Congo",
-                    "Equatorial Guinea",
-                    "Gabon",
-                    "Sao Tome and Principe",
-                    "Algeria",
-                    "Egypt",
-                    "Libya",
-                    "Morocco",
-                    "Sudan",
-                    "Tunisia",
-                    "Western Sahara",
-                    "Botswana",
-                    "Eswatini",
-                    "Lesotho",
-                    "Namibia",
-                    "South Africa",
-                    "Benin",
-                    "Burkina Faso",
-                    "Cabo Verde",
-                    "Côte d'Ivoire",
-                    "Gambia",
-                    "Ghana",
-                    "Guinea",
-                    "Guinea-Bissau",
-                    "Liberia",
-                    "Mali",
-                    "Mauritania",
-                    "Niger",
-                    "Nigeria",
-                    "Saint Helena",
-                    "Senegal",
-                    "Sierra Leone",
-                    "Togo",
-                    "Kazakhstan",
-                    "Kyrgyzstan",
-                    "Tajikistan",
-                    "Turkmenistan",
-                    "Uzbekistan",
-                    "China",
-                    "China, Hong Kong SAR",
-                    "China, Macao SAR",
-                    "China, Taiwan Province of China",
-                    "Dem. People's Republic of Korea",
-                    "Japan",
-                    "Mongolia",
-                    "Republic of Korea",
-                    "Afghanistan",
-                    "Bangladesh",
-                    "Bhutan",
-                    "India",
-                    "Iran (Islamic Republic of)",
-                    "Maldives",
-                    "Nepal",
-                    "Pakistan",
-                    "Sri Lanka",
-                    "Brunei Darussalam",
-                    "Cambodia",
-                    "Indonesia",
-                    "Lao People's Democratic Republic",
-                    "Malaysia",
-                    "Myanmar",
-                    "Philippines",
-                    "Singapore",
-                    "Thailand",
-                    "Timor-Leste",
-                    "Viet Nam",
-                    "Armenia",
-                    "Azerbaijan",
-                    "Bahrain",
-                    "Cyprus",
-                    "Georgia",
-                    "Iraq",
-                    "Israel",
-                    "Jordan",
-                    "Kuwait",
-                    "Lebanon",
-                    "Oman",
-                    "Qatar",
-                    "Saudi Arabia",
-                    "State of Palestine",
-                    "Syrian Arab Republic",
-                    "Türkiye",
-                    "United Arab Emirates",
-                    "Yemen",
-                    "Belarus",
-                    "Bulgaria",
-                    "Czechia",
-                    "Hungary",
-                    "Poland",
-                    "Republic of Moldova",
-                    "Romania",
-                    "Russian Federation",
-                    "Slovakia",
-                    "Ukraine",
-                    "Denmark",
-                    "Estonia",
-                    "Faroe Islands",
-                    "Finland",
-                    "Guernsey",
-                    "Iceland",
-                    "Ireland",
-                    "Isle of Man",
-                    "Jersey",
-                    "Latvia",
-                    "Lithuania",
-                    "Norway",
-                    "Sweden",
-                    "United Kingdom",
-                    "Albania",
-                    "Andorra",
-                    "Bosnia and Herzegovina",
-                    "Croatia",
-                    "Gibraltar",
-                    "Greece",
-                    "Holy See",
-                    "Italy",
-                    "Kosovo (under UNSC res. 1244)",
-                    "Malta",
-                    "Montenegro",
-                    "North Macedonia",
-                    "Portugal",
-                    "San Marino",
-                    "Serbia",
-                    "Slovenia",
-                    "Spain",
-                    "Austria",
-                    "Belgium",
-                    "France",
-                    "Germany",
-                    "Liechtenstein",
-                    "Luxembourg",
-                    "Monaco",
-                    "Netherlands",
-                    "Switzerland",
-                    "Anguilla",
-                    "Antigua and Barbuda",
-                    "Aruba",
-                    "Bahamas",
-                    "Barbados",
-                    "Bonaire, Sint Eustatius and Saba",
-                    "British Virgin Islands",
-                    "Cayman Islands",
-                    "Cuba",
-                    "Curaçao",
-                    "Dominica",
-                    "Dominican Republic",
-                    "Grenada",
-                    "Guadeloupe",
-                    "Haiti",
-                    "Jamaica",
-                    "Martinique",
-                    "Montserrat",
-                    "Puerto Rico",
-                    "Saint Barthélemy",
-                    "Saint Kitts and Nevis",
-                    "Saint Lucia",
-                    "Saint Martin (French part)",
-                    "Saint Vincent and the Grenadines",
-                    "Sint Maarten (Dutch part)",
-                    "Trinidad and Tobago",
-                    "Turks and Caicos Islands",
-                    "United States Virgin Islands",
-                    "Belize",
-                    "Costa Rica",
-                    "El Salvador",
-                    "Guatemala",
-                    "Honduras",
-                    "Mexico",
-                    "Nicaragua",
-                    "Panama",
-                    "Argentina",
-                    "Bolivia (Plurinational State of)",
-                    "Brazil",
-                    "Chile",
-                    "Colombia",
-                    "Ecuador",
-                    "Falkland Islands (Malvinas)",
-                    "French Guiana",
-                    "Guyana",
-                    "Paraguay",
-                    "Peru",
-                    "Suriname",
-                    "Uruguay",
-                    "Venezuela (Bolivarian Republic of)",
-                    "Bermuda",
-                    "Canada",
-                    "Greenland",
-                    "Saint Pierre and Miquelon",
-                    "United States of America",
-                    "Australia",
-                    "New Zealand",
-                    "Fiji",
-                    "New Caledonia",
-                    "Papua New Guinea",
-                    "Solomon Islands",
-                    "Vanuatu",
-                    "Guam",
-                    "Kiribati",
-                    "Marshall Islands",
-                    "Micronesia (Fed. States of)",
-                    "Nauru",
-                    "Northern Mariana Islands",
-                    "Palau",
-                    "American Samoa",
-                    "Cook Islands",
-                    "French Polynesia",
-                    "Niue",
-                    "Samoa",
-                    "Tokelau",
-                    "Tonga",
-                    "Tuvalu",
-                    "Wallis and Futuna Islands",
-                    ]
+    # the first name of each ISO code is used
+    incodes = incodes.drop_duplicates("ISO")
+    codes = dict(zip(incodes.ISO, incodes.Country))
 
+    UNreg = set(region_definition("SSP_UNreg"))
 
     checked = [name for name in list(codes.values()) if name not in UNreg]
 
@@ -447,42 +235,17 @@ def readSSP(years: list):
         print (checked)
         print ("These countries are not mapped ", checked)
 
+    missing = set(SSP["REGION"]) - set(codes)
+    if len(missing) > 0:
+        raise KeyError("ISO codes without a country name: %s" % sorted(missing))
 
-    scenarios = {"SSP3_v9_130115"	:	"SSP3"	,
-                "SSP1_v9_130219"	:	"SSP1"	,
-                "SSP2_v9_130219"	:	"SSP2"	,
-                "SSP3_v9_130219"	:	"SSP3"	,
-                "SSP4_v9_130219"	:	"SSP4"	,
-                "SSP5_v9_130219"	:	"SSP5"	,
-                "SSP1_v9_130325"	:	"SSP1"	,
-                "SSP2_v9_130325"	:	"SSP2"	,
-                "SSP3_v9_130325"	:	"SSP3"	,
-                "SSP4_v9_130325"	:	"SSP4"	,
-                "SSP5_v9_130325"	:	"SSP5"	,
-                "SSP1_v9_130424"	:	"SSP1"	,
-                "SSP2_v9_130424"	:	"SSP2"	,
-                "SSP3_v9_130424"	:	"SSP3"	,
-                "SSP4_v9_130424"	:	"SSP4"	,
-                "SSP5_v9_130424"	:	"SSP5"	,
-                "SSP5_v9_130115"	:	"SSP5"	,
-                "SSP1_v9_130115"	:	"SSP1"	,
-                "SSP2_v9_130115"	:	"SSP2"	,
-                "SSP4_v9_130115"	:	"SSP4"	,
-                "SSP4d_v9_130115"	:	"SSP4"	}
-
-    # SSPpop: renaming scenarios
-    SSPpop = pd.DataFrame( SSP.loc[SSP.VARIABLE == "Population"] )
-    for o in scenarios.keys():
-        SSPpop["SCENARIO"]  = SSPpop["SCENARIO"].replace(o, scenarios[o])
-        SSPpop["SCENARIO"]  = SSPpop["SCENARIO"].replace(o, scenarios[o])
-    SSPpop["REGION"] = SSPpop["REGION"].apply(lambda x: codes[x])
+    scenarios = region_definition("SSP_scenarios")
 
-    # SSPgdp: renaming scenarios
+    # renaming scenarios and ISO codes into country names
+    SSP["SCENARIO"] = SSP["SCENARIO"].replace(scenarios)
+    SSP["REGION"] = SSP["REGION"].map(codes)
+    SSPpop = pd.DataFrame( SSP.loc[SSP.VARIABLE == "Population"] )
     SSPgdp  = pd.DataFrame( SSP.loc[SSP.VARIABLE == "GDP|PPP"] )
-    for o in scenarios.keys():
-        SSPgdp["SCENARIO"]  = SSPgdp["SCENARIO"].replace(o, scenarios[o])
-        SSPgdp["SCENARIO"]  = SSPgdp["SCENARIO"].replace(o, scenarios[o])
-    SSPgdp["REGION"] = SSPgdp["REGION"].apply(lambda x: codes[x])
 
     SSPgroups = pd.DataFrame(SSPpop.groupby(["MODEL","SCENARIO"]).sum(numeric_only=True).reset_index())
     SSPgdpgroups  = pd.DataFrame(SSPgdp.groupby(["MODEL","SCENARIO"]).sum(numeric_only=True).reset_index())
@@ -497,168 +260,67 @@ def readSSP(years: list):
 
 def createsids():
     """Returns a dictionary with small island developing"""
-    UNreg = ["Antigua and Barbuda",
-            "Bahamas",
-            "Barbados",
-            "Belize",
-            "Cabo Verde",
-            "Comoros",
-            "Cook Islands",
-            "Cuba",
-            "Dominica",
-            "Dominican Republic",
-            "Fiji",
-            "Grenada",
-            "Guinea-Bissau",
-            "Guyana",
-            "Haiti",
-            "Jamaica",
-            "Kiribati",
-            "Maldives",
-            "Marshall Islands",
-            "Mauritius",
-            "Micronesia (Fed. States of)",
-            "Nauru",
-            "Niue",
-            "Palau",
-            "Papua New Guinea",
-            "Saint Kitts and Nevis",
-            "Saint Lucia",
-            "Saint Vincent and the Grenadines",
-            "Samoa",
-            "Sao Tome and Principe",
-            "Seychelles",
-            "Singapore",
-            "Solomon Islands",
-            "Suriname",
-            "Timor-Leste",
-            "Tonga",
-            "Trinidad and Tobago",
-            "Tuvalu",
-            "Vanuatu",]
-
-    return {"SIDs": UNreg}
+    return {"SIDs": region_definition("SIDs")}
 
 def createldcs():
     """Returns a dictionary with least developing countries"""
-    UNreg = ["Afghanistan",
-            "Angola",
-            "Bangladesh",
-            "Benin",
-            "Burkina Faso",
-            "Burundi",
-            "Cambodia",
-            "Central African Republic",
-            "Chad",
-            "Comoros",
-            "Democratic Republic of the Congo",
-            "Djibouti",
-            "Eritrea",
-            "Ethiopia",
-            "Gambia",
-            "Guinea",
-            "Guinea-Bissau",
-            "Haiti",
-            "Kiribati",
-            "Lao People's Democratic Republic",
-            "Lesotho",
-            "Liberia",
-            "Madagascar",
-            "Malawi",
-            "Mali",
-            "Mauritania",
-            "Mozambique",
-            "Myanmar",
-            "Nepal",
-            "Niger",
-            "Rwanda",
-            "Sao Tome and Principe",
-            "Senegal",
-            "Sierra Leone",
-            "Solomon Islands",
-            "Somalia",
-            "South Sudan",
-            "Sudan",
-            "Timor-Leste",
-            "Togo",
-            "Tuvalu",
-            "Uganda",
-            "United Republic of Tanzania",
-            "Yemen",
-            "Zambia",]
-
-    return {"LDCs": UNreg}
+    return {"LDCs": region_definition("LDCs")}
 
 def createlldcs():
     """Returns a dictionary with landlocked least developing countries""" 
-    UNreg = ["Afghanistan",
-            "Armenia",
-            "Azerbaijan",
-            "Bhutan",
-            "Botswana",
-            "Burkina Faso",
-            "Burundi",
-            "Central African Republic",
-            "Chad",
-            "Eswatini",
-            "Ethiopia",
-            "Kazakhstan",
-            "Kyrgyzstan",
-            "Lao People's Democratic Republic",
-            "Lesotho",
-            "Malawi",
-            "Mali",
-            "Mongolia",
-            "Nepal",
-            "Niger",
-            "North Macedonia",
-            "Paraguay",
-            "Bolivia (Plurinational State of)",
-            "Republic of Moldova",
-            "Rwanda",
-            "South Sudan",
-            "Tajikistan",
-            "Turkmenistan",
-            "Uganda",
-            "Uzbekistan",
-            "Zambia",
-            "Zimbabwe",]
-
-    return {"LLDCs": UNreg}
-
-
-def readSSPnew(years: list, selected_scenarios: list, region_dict: dict):
+    return {"LLDCs": region_definition("LLDCs")}
+
+
+def ssp_region_pairs(region_dict: dict):
+    """Returns a dataframe with one row for each pair of SSP region name (Region)
+    and new region name (IPCCRegion) of region_dict, which can be
+    - {SSP region name: new region name}, e.g. {"World": "WORLD"}; as with replace,
+    SSP names equal to a new region name which is not a key are kept as they are
+    - {new region name: list of SSP region names}, e.g. createsids(), createIPCC5R()
+    A name can belong to several regions (e.g. WORLD and R5ASIA in createIPCC5R())"""
+    rows = []
+    for key, value in region_dict.items():
+        if isinstance(value, (list, tuple, set)):
+            rows += [(name, key) for name in value]
+        elif value not in region_dict:
+            rows += [(key, value), (value, value)]
+        else:
+            rows.append((key, value))
+    return pd.DataFrame(rows, columns=["Region", "IPCCRegion"]).drop_duplicates()
+
+def readSSPnew(years: list, selected_scenarios: list, region_dict, cache=True):
 
     """Read Shared Socioeconomic Pathays data from folder data\SSP
     Receives:
     - years: list of years 
     - selected_scenarios: list of chosen scenarios to represent
-    - region_dict: dictionary of regions 
+    - region_dict: dictionary of regions in one of the layouts of ssp_region_pairs,
+    or list of dictionaries
+    - cache: if True, SSPv3.csv is read through a parquet cache
     Returns:
-    SSPnew: A dataframe with SSP population into world, R5 regions
+    SSPnew: A dataframe with SSP population into world, R5 regions,
+    or a list with one dataframe for each dictionary if region_dict is a list
     """
 
     folder = 'data/SSP'
     filename = 'SSPv3.csv'
-    SSPvnew = pd.read_csv(os.path.join(folder, filename))
+    SSPvnew = read_cached(os.path.join(folder, filename), cache, title=False, encoding=None,
+                          filters=[("Scenario", "in", list(selected_scenarios))])
 
     syears = [str(y) for y in years]
-    SSPvnew = pd.DataFrame(SSPvnew[SSPvnew.Scenario.isin(selected_scenarios)])
-
-    str_columns = ["Model", "Scenario", "Region", "Unit"]
-    keep_columns = str_columns + syears
-    SSPvnew = SSPvnew[keep_columns]
-
-    for r in region_dict.keys():
-        SSPvnew["Region"] = SSPvnew["Region"].replace(r, region_dict[r])
-
-    selected_regions = list(region_dict.values())
-
-    SSPvnew = pd.DataFrame(SSPvnew[SSPvnew.Region.isin(selected_regions)].groupby(["Model","Region", "Scenario"]).sum([years])).reset_index()
-
-    SSPvnew = SSPvnew.rename(columns={"Region": "IPCCRegion"})
-        
-    return SSPvnew
+    SSPvnew = SSPvnew[["Model", "Scenario", "Region"] + syears]
+
+    region_dicts = [region_dict] if isinstance(region_dict, dict) else list(region_dict)
+    frames = []
+    for reg_dict in region_dicts:
+        # rows of names in several regions are repeated, once for each region
+        SSPnew = SSPvnew.merge(ssp_region_pairs(reg_dict), on="Region")
+        SSPnew = SSPnew.groupby(["Model", "IPCCRegion", "Scenario"])[syears].sum().reset_index()
+        frames.append(SSPnew)
+
+    if isinstance(region_dict, dict):
+        return frames[0]
+    return frames
 
 
 def counts (data: pd.DataFrame, region: str):